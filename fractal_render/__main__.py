@@ -0,0 +1,3 @@
+from fractal_render.cli import main
+
+main()
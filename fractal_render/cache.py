@@ -0,0 +1,42 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+# Content-addressed store for rendered images: the key is a hash of everything
+# that determines the output pixels (fractal, resolved parameters, resolution,
+# style), so identical requests are served from disk without re-rendering.
+# Bump CACHE_VERSION when a change to the renderers alters their output.
+
+CACHE_VERSION = 1
+DEFAULT_CACHE_DIR = os.environ.get('FRACTAL_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'random_fun'))
+
+
+def cache_key(name, params, resolution, style):
+    payload = {'version': CACHE_VERSION, 'fractal': name, 'params': params,
+               'resolution': list(resolution) if not isinstance(resolution, int) else resolution, 'style': style}
+    blob = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+
+class RenderCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f'{key}.png')
+
+    def get(self, key):
+        path = self.path(key)
+        return path if os.path.exists(path) else None
+
+    def put(self, key, src_path):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Copy then rename so concurrent readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        os.close(fd)
+        shutil.copyfile(src_path, tmp_path)
+        os.replace(tmp_path, path)
+        return path
@@ -0,0 +1,91 @@
+import argparse
+import itertools
+import os
+import shutil
+import time
+from fractal_render.cache import RenderCache, DEFAULT_CACHE_DIR, cache_key
+from fractal_render.fractals import FRACTALS, check_tiles, render, resolve_params, save
+
+# Usage (from the repository root):
+#   python -m fractal_render tree --levels 12 --angle-increment 25 --output tree_fractal/tree_fractal.png
+#   python -m fractal_render tree --levels 14,16,18 --angle-jitter 0,5 --resolution 4096 --tiles 4
+#   python -m fractal_render sierpinski --n-vertex 5 --jump-ratio 0 --forbidden-offsets 0 --n-points 200000000
+#   python -m fractal_render orbit --n-vertex 600 --n-neighbor 3 --gap 0,10,20
+#   python -m fractal_render tree --levels 14 --resolution 512 --tiles 4 --check-tiles
+# Comma-separated values are expanded into a parameter sweep (cartesian product).
+
+
+def _parse_resolution(value):
+    if 'x' in value:
+        width, height = value.lower().split('x')
+        return int(width), int(height)
+    return int(value)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m fractal_render', description='Render fractals to PNG.')
+    subparsers = parser.add_subparsers(dest='fractal', required=True)
+    for name, fractal in FRACTALS.items():
+        sub = subparsers.add_parser(name)
+        for key, (cast, default) in fractal['params'].items():
+            sub.add_argument(f"--{key.replace('_', '-')}", dest=key, default=None,
+                             help=f"{cast.__name__}, default {default!r}; comma-separated values render a sweep")
+        sub.add_argument('--resolution', type=_parse_resolution, default=1024, help='N or WIDTHxHEIGHT pixels')
+        sub.add_argument('--tone', choices=['coverage', 'linear', 'log', 'equalize'], default=None)
+        sub.add_argument('--tiles', type=int, default=1, help='split the canvas into TILES x TILES tiles')
+        sub.add_argument('--workers', type=int, default=None, help='process pool size (default: CPU count)')
+        sub.add_argument('--output', default=None, help='output path (single render only)')
+        sub.add_argument('--output-dir', default='renders')
+        sub.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+        sub.add_argument('--no-cache', action='store_true')
+        sub.add_argument('--check-tiles', action='store_true',
+                         help='only check that --tiles gives the same pixels as one canvas (segment fractals)')
+    return parser
+
+
+def sweep(name, args):
+    keys = list(FRACTALS[name]['params'])
+    values = [getattr(args, key).split(',') if getattr(args, key) is not None else [None] for key in keys]
+    for combo in itertools.product(*values):
+        yield resolve_params(name, {k: v for k, v in zip(keys, combo) if v is not None})
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    name = args.fractal
+    jobs = list(sweep(name, args))
+    if args.output is not None and len(jobs) > 1:
+        raise SystemExit('--output can only be used for a single render; use --output-dir for sweeps')
+    cache = None if args.no_cache else RenderCache(args.cache_dir)
+    style = {'tone': args.tone}
+
+    if args.check_tiles:
+        if FRACTALS[name]['kind'] != 'segments':
+            raise SystemExit('--check-tiles only applies to segment fractals (tree, orbit)')
+        failed = 0
+        for params in jobs:
+            mismatch = check_tiles(name, params, args.resolution, max(args.tiles, 2), args.workers)
+            failed += mismatch > 0
+            print(f"{'ok' if mismatch == 0 else 'MISMATCH'} {mismatch} pixels differ with {max(args.tiles, 2)} tiles {params}")
+        raise SystemExit(1 if failed else 0)
+
+    for params in jobs:
+        key = cache_key(name, params, args.resolution, {**FRACTALS[name]['style'], **{k: v for k, v in style.items() if v is not None}})
+        output = args.output or os.path.join(args.output_dir, f'{name}-{key[:12]}.png')
+        os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+        start = time.perf_counter()
+        cached = cache.get(key) if cache is not None else None
+        if cached is not None:
+            shutil.copyfile(cached, output)
+            status = 'cached'
+        else:
+            canvas = render(name, params, args.resolution, tiles=args.tiles, workers=args.workers)
+            save(name, canvas, output, **style)
+            if cache is not None:
+                cache.put(key, output)
+            status = 'rendered'
+        print(f"{status} {output} in {time.perf_counter() - start:.2f}s {params}")
+
+
+if __name__ == '__main__':
+    main()
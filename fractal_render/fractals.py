@@ -0,0 +1,140 @@
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from fractal_render.raster import Canvas, fit_bounds
+
+# Registry of renderable fractals. Segment fractals (tree, orbit) are split
+# into tiles that are rasterized in parallel processes; every worker rebuilds
+# the (cheap, deterministic) geometry from the parameters and only samples the
+# segments crossing its tile. Point fractals (chaos games) parallelize over
+# independent streams inside run_chaos_game instead.
+
+
+def _tree_geometry(params):
+    from tree_fractal.tree_fractal import tree_segments, level_colors
+    segments = tree_segments(params['levels'], params['angle_increment'], params['angle_jitter'],
+                             params['length_jitter'], params['seed'])
+    return segments[:, :4].reshape(-1, 2, 2), level_colors(segments[:, 4])
+
+
+def _orbit_geometry(params):
+    from orbit.orbit import star_polygon
+    _, segments = star_polygon(params['n_vertex'], params['n_neighbor'], params['gap'])
+    return segments, None
+
+
+def _chaos_game_ifs(params):
+    from sierpinski_triangle_fractal.chaos_game import ngon
+    offsets = [int(o) for o in str(params['forbidden_offsets']).split(':') if o != '']
+    jump_ratio = params['jump_ratio'] if params['jump_ratio'] > 0 else None
+    return ngon(params['n_vertex'], jump_ratio, forbidden_offsets=offsets)
+
+
+def _fern_ifs(params):
+    from sierpinski_triangle_fractal.chaos_game import barnsley_fern
+    return barnsley_fern()
+
+
+FRACTALS = {
+    'tree': {
+        'kind': 'segments',
+        'geometry': _tree_geometry,
+        'params': {'levels': (int, 12), 'angle_increment': (float, 25.0), 'angle_jitter': (float, 0.0),
+                   'length_jitter': (float, 0.0), 'seed': (int, 0)},
+        'style': {'tone': 'coverage'},
+    },
+    'orbit': {
+        'kind': 'segments',
+        'geometry': _orbit_geometry,
+        'bounds': ((-1.05, 1.05), (-1.05, 1.05)),
+        'params': {'n_vertex': (int, 12), 'n_neighbor': (int, 2), 'gap': (int, 0)},
+        'style': {'tone': 'coverage', 'color': (0, 0, 255)},
+    },
+    'sierpinski': {
+        'kind': 'points',
+        'ifs': _chaos_game_ifs,
+        # jump_ratio <= 0 picks the ratio at which the copies just touch;
+        # forbidden_offsets are ':'-separated, e.g. 0 or 0:2
+        'params': {'n_points': (int, 10_000_000), 'n_vertex': (int, 3), 'jump_ratio': (float, 0.5),
+                   'forbidden_offsets': (str, ''), 'seed': (int, 0)},
+        'style': {'tone': 'log', 'color': (220, 0, 0)},
+    },
+    'fern': {
+        'kind': 'points',
+        'ifs': _fern_ifs,
+        'params': {'n_points': (int, 10_000_000), 'seed': (int, 0)},
+        'style': {'tone': 'log', 'color': (0, 120, 0)},
+    },
+}
+
+
+def resolve_params(name, params):
+    spec = FRACTALS[name]['params']
+    unknown = set(params) - set(spec)
+    if unknown:
+        raise ValueError(f"Unknown parameters for '{name}': {', '.join(sorted(unknown))}")
+    return {key: cast(params[key]) if key in params else default for key, (cast, default) in spec.items()}
+
+
+def split_tiles(width, height, tiles):
+    # Splits the canvas into about `tiles` horizontal and vertical bands each.
+    rows = np.linspace(0, height, min(tiles, height) + 1).astype(int)
+    cols = np.linspace(0, width, min(tiles, width) + 1).astype(int)
+    return [(r0, c0, r1 - r0, c1 - c0) for r0, r1 in zip(rows[:-1], rows[1:]) for c0, c1 in zip(cols[:-1], cols[1:])]
+
+
+def _render_tile(args):
+    name, params, tile, window = args
+    segments, colors = FRACTALS[name]['geometry'](params)
+    tile.add_segments(segments, colors=colors)
+    return window, tile
+
+
+def _canvas_size(resolution):
+    return (resolution, resolution) if np.isscalar(resolution) else tuple(resolution)
+
+
+def render(name, params=None, resolution=1024, tiles=1, workers=None):
+    # Returns the accumulated Canvas; tone mapping is applied when saving so
+    # that it is global across tiles.
+    fractal = FRACTALS[name]
+    params = resolve_params(name, params or {})
+    workers = (os.cpu_count() or 1) if workers is None else workers
+
+    if fractal['kind'] == 'points':
+        from sierpinski_triangle_fractal.chaos_game import run_chaos_game
+        density, bounds = run_chaos_game(fractal['ifs'](params), params['n_points'], _canvas_size(resolution),
+                                         seed=params['seed'], n_workers=workers)
+        canvas = Canvas(bounds, _canvas_size(resolution))
+        canvas.add_density(density)
+        return canvas
+
+    bounds = fractal.get('bounds')
+    if bounds is None:
+        segments, _ = fractal['geometry'](params)
+        bounds = fit_bounds(segments.reshape(-1, 2), square=True)
+    canvas = Canvas(bounds, _canvas_size(resolution))
+    jobs = [(name, params, canvas.tile(*window), window) for window in split_tiles(canvas.width, canvas.height, tiles)]
+    if workers <= 1 or len(jobs) <= 1:
+        for (row, col, _, _), tile in map(_render_tile, jobs):
+            canvas.paste(tile, row, col)
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+            for (row, col, _, _), tile in executor.map(_render_tile, jobs):
+                canvas.paste(tile, row, col)
+    return canvas
+
+
+def check_tiles(name, params=None, resolution=512, tiles=4, workers=1):
+    # Segment fractals must give the same accumulators whether or not the
+    # canvas is split into tiles; returns the number of differing pixels.
+    full = render(name, params, resolution, tiles=1, workers=workers)
+    tiled = render(name, params, resolution, tiles=tiles, workers=workers)
+    mismatch = full.density != tiled.density
+    if full.mean_color is not None:
+        mismatch |= (full._color_sum != tiled._color_sum).reshape(3, full.height, full.width).any(axis=0)
+    return int(mismatch.sum())
+
+
+def save(name, canvas, path, **style):
+    canvas.save_png(path, **{**FRACTALS[name]['style'], **{k: v for k, v in style.items() if v is not None}})
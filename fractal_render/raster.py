@@ -0,0 +1,293 @@
+import struct
+import zlib
+import numpy as np
+
+# Resolution-bound rasterizer shared by the fractal scripts.
+# Points and line segments are binned into a fixed-size accumulation buffer
+# with vectorized NumPy (bincount), then tone mapped and written straight to
+# PNG. The cost per primitive is a few array operations and the memory and
+# output cost depend only on the image size, unlike plt.scatter / plt.plot
+# which create one artist (or one path vertex) per primitive.
+
+MAX_SAMPLES_PER_CHUNK = 1 << 22
+
+
+def fit_bounds(points, padding=0.02, square=False):
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if len(points) == 0:
+        return (0.0, 1.0), (0.0, 1.0)
+    lo = points.min(axis=0)
+    hi = points.max(axis=0)
+    if square:
+        center = (lo + hi) / 2
+        half = (hi - lo).max() / 2
+        lo, hi = center - half, center + half
+    pad = (hi - lo) * padding + 1e-12
+    lo, hi = lo - pad, hi + pad
+    return (lo[0], hi[0]), (lo[1], hi[1])
+
+
+class Canvas:
+    # Accumulates weighted hits, and optionally per-hit RGB colors, on a
+    # (height, width) grid covering bounds = ((x_min, x_max), (y_min, y_max)).
+    # A tile keeps the bounds and scale of its parent canvas plus the integer
+    # pixel offset of its window, so pixel coordinates are computed exactly as
+    # in the parent and only shifted after flooring.
+    def __init__(self, bounds, resolution, offset=(0, 0), scale=None):
+        (self.x_min, self.x_max), (self.y_min, self.y_max) = bounds
+        self.width, self.height = (resolution, resolution) if np.isscalar(resolution) else resolution
+        self.size = self.width * self.height
+        self.row_offset, self.col_offset = offset
+        if scale is None:
+            scale = (self.width / (self.x_max - self.x_min), self.height / (self.y_max - self.y_min))
+        self.x_scale, self.y_scale = scale
+        self._density = np.zeros(self.size, dtype=np.float64)
+        self._color_sum = None
+        self._pending = []
+        self._n_pending = 0
+
+    @property
+    def bounds(self):
+        return (self.x_min, self.x_max), (self.y_min, self.y_max)
+
+    def to_pixels(self, xy):
+        # Pixel coordinates in the parent canvas (equal to this canvas unless it is a tile)
+        xy = np.asarray(xy, dtype=np.float64)
+        px = (xy[..., 0] - self.x_min) * self.x_scale
+        py = (self.y_max - xy[..., 1]) * self.y_scale
+        return px, py
+
+    def _flat_index(self, px, py):
+        ix = np.floor(px).astype(np.int64) - self.col_offset
+        iy = np.floor(py).astype(np.int64) - self.row_offset
+        inside = (ix >= 0) & (ix < self.width) & (iy >= 0) & (iy < self.height)
+        return iy * self.width + ix, inside
+
+    def _accumulate(self, flat, weights=None, colors=None):
+        if colors is not None:
+            self.flush()
+            if self._color_sum is None:
+                self._color_sum = np.zeros((3, self.size), dtype=np.float64)
+            w = np.ones(len(flat)) if weights is None else weights
+            for c in range(3):
+                self._color_sum[c] += np.bincount(flat, weights=w * colors[:, c], minlength=self.size)
+            self._density += np.bincount(flat, weights=w, minlength=self.size)
+        elif weights is not None:
+            self._density += np.bincount(flat, weights=weights, minlength=self.size)
+        else:
+            # Unweighted hits are buffered so the O(pixels) bincount pass is
+            # amortized over many small chunks.
+            self._pending.append(flat)
+            self._n_pending += len(flat)
+            if self._n_pending >= self.size:
+                self.flush()
+
+    def flush(self):
+        if self._pending:
+            self._density += np.bincount(np.concatenate(self._pending), minlength=self.size)
+            self._pending = []
+            self._n_pending = 0
+
+    def add_points(self, points, weights=None, colors=None):
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        flat, inside = self._flat_index(*self.to_pixels(points))
+        self._accumulate(
+            flat[inside],
+            None if weights is None else np.broadcast_to(np.asarray(weights, dtype=np.float64), inside.shape)[inside],
+            None if colors is None else _broadcast_colors(colors, len(points))[inside],
+        )
+
+    def _clip(self, px, py):
+        # Liang-Barsky clipping of all segments against the canvas rectangle.
+        # Returns the visible parameter range [t0, t1] of each segment.
+        dx = px[:, 1] - px[:, 0]
+        dy = py[:, 1] - py[:, 0]
+        t0 = np.zeros(len(px))
+        t1 = np.ones(len(px))
+        visible = np.ones(len(px), dtype=bool)
+        left, top = self.col_offset, self.row_offset
+        for p, q in ((-dx, px[:, 0] - left), (dx, left + self.width - px[:, 0]),
+                     (-dy, py[:, 0] - top), (dy, top + self.height - py[:, 0])):
+            parallel = p == 0
+            visible &= ~(parallel & (q < 0))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                r = q / p
+            t0 = np.where(~parallel & (p < 0), np.maximum(t0, r), t0)
+            t1 = np.where(~parallel & (p > 0), np.minimum(t1, r), t1)
+        return t0, t1, visible & (t0 <= t1)
+
+    def add_segments(self, segments, weights=None, colors=None):
+        # segments: (n, 2, 2) array of ((x1, y1), (x2, y2)). Each segment is
+        # sampled once per pixel along its major axis (DDA), all at once.
+        # Only samples inside the canvas are generated, and they sit on the
+        # same grid as for the unclipped segment, so tiles rendered separately
+        # stitch into exactly the full-canvas image.
+        segments = np.asarray(segments, dtype=np.float64).reshape(-1, 2, 2)
+        if weights is not None:
+            weights = np.broadcast_to(np.asarray(weights, dtype=np.float64), (len(segments),))
+        if colors is not None:
+            colors = _broadcast_colors(colors, len(segments))
+        px, py = self.to_pixels(segments)
+        t0, t1, visible = self._clip(px, py)
+        n_steps = np.ceil(np.maximum(np.abs(px[:, 1] - px[:, 0]), np.abs(py[:, 1] - py[:, 0]))).astype(np.int64)
+        first = np.ceil(t0 * n_steps - 1e-9).astype(np.int64)
+        steps = np.where(visible, np.floor(t1 * n_steps + 1e-9).astype(np.int64) - first + 1, 0)
+        keep = steps > 0
+        px, py, n_steps, first, steps = px[keep], py[keep], n_steps[keep], first[keep], steps[keep]
+        if weights is not None:
+            weights = weights[keep]
+        if colors is not None:
+            colors = colors[keep]
+
+        ends = np.cumsum(steps)
+        start = 0
+        while start < len(px):
+            base = ends[start - 1] if start > 0 else 0
+            stop = max(start + 1, int(np.searchsorted(ends, base + MAX_SAMPLES_PER_CHUNK, side='right')))
+            chunk_steps = steps[start:stop]
+            seg = np.repeat(np.arange(start, stop), chunk_steps)
+            offsets = np.arange(len(seg)) - np.repeat(ends[start:stop] - chunk_steps - base, chunk_steps)
+            t = (first[seg] + offsets) / np.maximum(n_steps[seg], 1)
+            sx = px[seg, 0] + t * (px[seg, 1] - px[seg, 0])
+            sy = py[seg, 0] + t * (py[seg, 1] - py[seg, 0])
+            flat, inside = self._flat_index(sx, sy)
+            self._accumulate(
+                flat[inside],
+                None if weights is None else weights[seg[inside]],
+                None if colors is None else colors[seg[inside]],
+            )
+            start = stop
+
+    def add_density(self, density):
+        self._density += np.asarray(density, dtype=np.float64).reshape(-1)
+
+    def paste(self, tile, row, col):
+        # Adds the raw accumulators of a canvas rendered at the same scale
+        # (e.g. one tile of this canvas) at pixel offset (row, col).
+        rows = slice(row, row + tile.height)
+        cols = slice(col, col + tile.width)
+        self.density[rows, cols] += tile.density
+        if tile._color_sum is not None:
+            if self._color_sum is None:
+                self._color_sum = np.zeros((3, self.size), dtype=np.float64)
+            self._color_sum.reshape(3, self.height, self.width)[:, rows, cols] += \
+                tile._color_sum.reshape(3, tile.height, tile.width)
+
+    def tile(self, row, col, height, width):
+        # Empty canvas covering the given pixel window of this canvas.
+        return Canvas(self.bounds, (width, height), offset=(self.row_offset + row, self.col_offset + col),
+                      scale=(self.x_scale, self.y_scale))
+
+    @property
+    def density(self):
+        self.flush()
+        return self._density.reshape(self.height, self.width)
+
+    @property
+    def mean_color(self):
+        # Hit-weighted average RGB per pixel in [0, 1], or None if no colors were given.
+        if self._color_sum is None:
+            return None
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = self._color_sum / np.maximum(self.density.reshape(-1), 1e-12)
+        return np.moveaxis(mean, 0, -1).reshape(self.height, self.width, 3)
+
+    def to_rgb(self, tone='log', color=(0, 0, 0), background=(255, 255, 255), cmap=None, gamma=1.0):
+        return colorize(tone_map(self.density, tone, gamma), color=color, background=background,
+                        cmap=cmap, pixel_colors=self.mean_color)
+
+    def save_png(self, path, **kwargs):
+        write_png(path, self.to_rgb(**kwargs))
+
+
+def _broadcast_colors(colors, n):
+    colors = np.asarray(colors, dtype=np.float64)
+    if colors.max(initial=0) > 1:
+        colors = colors / 255
+    return np.broadcast_to(colors.reshape(-1, 3), (n, 3))
+
+
+def tone_map(density, method='log', gamma=1.0):
+    # Maps raw hit counts to [0, 1]. 'log' compresses the huge dynamic range of
+    # fractal point clouds, 'equalize' spreads the non-empty pixels uniformly
+    # over the output range by rank, 'coverage' shows any hit at full strength
+    # (crisp line art).
+    density = np.asarray(density, dtype=np.float64)
+    if method == 'coverage':
+        values = np.minimum(density, 1.0)
+    elif method == 'linear':
+        top = density.max(initial=0)
+        values = density / top if top > 0 else np.zeros_like(density)
+    elif method == 'log':
+        top = np.log1p(density.max(initial=0))
+        values = np.log1p(density) / top if top > 0 else np.zeros_like(density)
+    elif method == 'equalize':
+        values = np.zeros_like(density)
+        nonzero = density > 0
+        if nonzero.any():
+            levels, inverse, counts = np.unique(density[nonzero], return_inverse=True, return_counts=True)
+            cdf = np.cumsum(counts) / counts.sum()
+            values[nonzero] = cdf[inverse]
+    else:
+        raise ValueError(f"Unknown tone mapping '{method}', expected 'coverage', 'linear', 'log' or 'equalize'")
+    if gamma != 1.0:
+        values = values ** (1.0 / gamma)
+    return values
+
+
+def colorize(values, color=(0, 0, 0), background=(255, 255, 255), cmap=None, pixel_colors=None):
+    # Blends from background to color (or to per-pixel colors) by values, or
+    # looks values up in a matplotlib colormap. Returns (h, w, 3) uint8.
+    values = np.clip(np.asarray(values, dtype=np.float64), 0, 1)[..., None]
+    bg = np.asarray(background, dtype=np.float64) / 255
+    if cmap is not None:
+        import matplotlib
+        rgb = matplotlib.colormaps[cmap](values[..., 0])[..., :3]
+    else:
+        fg = np.asarray(color, dtype=np.float64) / 255 if pixel_colors is None else np.nan_to_num(pixel_colors)
+        rgb = bg + (fg - bg) * values
+    return np.round(np.clip(rgb, 0, 1) * 255).astype(np.uint8)
+
+
+def write_png(path, rgb):
+    # Minimal truecolor (or grayscale for 2-D input) 8-bit PNG writer.
+    rgb = np.ascontiguousarray(rgb, dtype=np.uint8)
+    height, width = rgb.shape[:2]
+    color_type = 0 if rgb.ndim == 2 else {1: 0, 3: 2, 4: 6}[rgb.shape[2]]
+    rows = rgb.reshape(height, -1)
+    raw = np.hstack([np.zeros((height, 1), dtype=np.uint8), rows]).tobytes()
+
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, color_type, 0, 0, 0)))
+        f.write(chunk(b'IDAT', zlib.compress(raw, 6)))
+        f.write(chunk(b'IEND', b''))
+
+
+def render_points(points, path=None, bounds=None, resolution=1024, **kwargs):
+    # points may be one (n, 2) array or an iterable of chunks (bounds required then).
+    if bounds is None:
+        bounds = fit_bounds(points)
+        points = [points]
+    elif isinstance(points, np.ndarray):
+        points = [points]
+    canvas = Canvas(bounds, resolution)
+    for chunk in points:
+        canvas.add_points(chunk)
+    if path is not None:
+        canvas.save_png(path, **kwargs)
+    return canvas
+
+
+def render_segments(segments, path=None, bounds=None, resolution=1024, colors=None, **kwargs):
+    segments = np.asarray(segments, dtype=np.float64).reshape(-1, 2, 2)
+    if bounds is None:
+        bounds = fit_bounds(segments.reshape(-1, 2), square=True)
+    canvas = Canvas(bounds, resolution)
+    canvas.add_segments(segments, colors=colors)
+    if path is not None:
+        canvas.save_png(path, **kwargs)
+    return canvas
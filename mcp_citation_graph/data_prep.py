@@ -1,11 +1,113 @@
 import ijson
 import json
+import argparse
 from decimal import Decimal
 from tqdm import tqdm
 import pandas as pd
 
 
-def process_dblp():
+# Normalized output: records keep integer indexes into side tables of distinct
+# authors, orgs, venues and fields of study instead of repeating the strings.
+VENUE_FIELDS = ("venue_id", "venue_name", "venue_type")
+READ_BATCH_SIZE = 1000
+
+
+def normalize_fos_name(name):
+    # Fields that only differ by case or whitespace are the same entity
+    return " ".join(str(name).casefold().split())
+
+
+class Interner:
+    # Dense integer ids for distinct keys, kept as a list of values by id
+    def __init__(self):
+        self.ids = {}
+        self.values = []
+
+    def get(self, key, value=None):
+        i = self.ids.get(key)
+        if i is None:
+            i = self.ids[key] = len(self.values)
+            self.values.append(key if value is None else value)
+        return i
+
+
+def normalized_paths(path):
+    stem = path[:-len('.json')] if path.endswith('.json') else path
+    return f"{stem}.normalized.json", f"{stem}.tables.json"
+
+
+def normalize_dataset(input_path):
+    # Writes <stem>.normalized.json (one record per line) and <stem>.tables.json
+    records_path, tables_path = normalized_paths(input_path)
+    authors, orgs, venues, fos = Interner(), Interner(), Interner(), Interner()
+    count = 0
+    with open(input_path, 'rb') as infile, open(records_path, 'w', encoding='utf-8') as outfile:
+        outfile.write('[\n')
+        for entry in tqdm(ijson.items(infile, 'item', use_float=True), desc=f"Normalizing {input_path}"):
+            if "author_names" in entry:
+                names = entry.pop("author_names")
+                ids = entry.pop("author_ids", None) or [""] * len(names)
+                entry_orgs = entry.pop("author_orgs", None) or [""] * len(names)
+                entry["author_idx"] = [authors.get((a_id, name), [a_id, name]) for a_id, name in zip(ids, names)]
+                entry["org_idx"] = [orgs.get(org) for org in entry_orgs]
+            if "venue_name" in entry:
+                venue = tuple(entry.pop(k, "") for k in VENUE_FIELDS)
+                entry["venue_idx"] = venues.get(venue, list(venue))
+            if "fos_names" in entry:
+                entry["fos_idx"] = [fos.get(normalize_fos_name(name), name) for name in entry.pop("fos_names")]
+            if count:
+                outfile.write(',\n')
+            json.dump(entry, outfile, ensure_ascii=False, separators=(',', ':'))
+            count += 1
+        outfile.write('\n]\n')
+
+    with open(tables_path, 'w', encoding='utf-8') as f:
+        json.dump({"authors": authors.values, "orgs": orgs.values, "venues": venues.values, "fos": fos.values},
+                  f, ensure_ascii=False, separators=(',', ':'))
+    print(f"Normalized {count} entries ({len(authors.values)} authors, {len(orgs.values)} orgs, {len(venues.values)} venues, "
+          f"{len(fos.values)} fields of study) and written to {records_path} and {tables_path}")
+    return records_path, tables_path
+
+
+def _record_batches(records_path, batch_size=READ_BATCH_SIZE):
+    # Records are written one per line, so batches of lines are decoded with
+    # one json.loads call each instead of an incremental parser.
+    with open(records_path, 'r', encoding='utf-8') as f:
+        batch = []
+        for line in f:
+            line = line.strip()
+            if line.startswith('{'):
+                batch.append(line.rstrip(','))
+                if len(batch) >= batch_size:
+                    yield json.loads('[' + ','.join(batch) + ']')
+                    batch = []
+        if batch:
+            yield json.loads('[' + ','.join(batch) + ']')
+
+
+def read_normalized(records_path, tables_path=None):
+    # Yields the records joined back with the side tables, in the same shape as
+    # the denormalized files.
+    if tables_path is None:
+        tables_path = records_path.replace('.normalized.json', '.tables.json')
+    with open(tables_path, 'r', encoding='utf-8') as f:
+        tables = json.load(f)
+    authors, orgs, venues, fos = tables["authors"], tables["orgs"], tables["venues"], tables["fos"]
+    for batch in _record_batches(records_path):
+        for entry in batch:
+            if "author_idx" in entry:
+                author_idx = entry.pop("author_idx")
+                entry["author_names"] = [authors[i][1] for i in author_idx]
+                entry["author_orgs"] = [orgs[i] for i in entry.pop("org_idx")]
+                entry["author_ids"] = [authors[i][0] for i in author_idx]
+            if "venue_idx" in entry:
+                entry.update(zip(VENUE_FIELDS, venues[entry.pop("venue_idx")]))
+            if "fos_idx" in entry:
+                entry["fos_names"] = [fos[i] for i in entry.pop("fos_idx")]
+            yield entry
+
+
+def process_dblp(normalize=False):
     input_path = 'data/dblp.v12.json'
     output_path = 'data/dblp.filtered.json'
 
@@ -57,6 +159,14 @@ def process_dblp():
         json.dump(entries, f, indent=4, ensure_ascii=False, default=lambda o: float(o) if isinstance(o, Decimal) else o)
     print(f"Second filtering: {len(entries)} entries out of {count} and written to 'data/dblp.filtered.y2000_r9_c5.json'")
 
+    if normalize:
+        normalize_dataset(output_path)
+        normalize_dataset('data/dblp.filtered.y2000_r9_c5.json')
+
 
 if __name__ == "__main__":
-    process_dblp()
+    parser = argparse.ArgumentParser(description="Filter the raw DBLP dataset")
+    parser.add_argument("--normalize", action="store_true",
+                        help="also write normalized outputs with author/org/venue/fos side tables")
+    args = parser.parse_args()
+    process_dblp(normalize=args.normalize)
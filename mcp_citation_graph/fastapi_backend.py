@@ -1,75 +1,523 @@
+import os
+import json
+import time
+import logging
+import threading
+import contextvars
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import asynccontextmanager
+# Imported before the third-party packages so the startup profile covers them
+from metrics import STARTUP, REGISTRY, REQUEST_LATENCY, TRAVERSAL_NODES, TRAVERSAL_TRUNCATIONS, start_trace, end_trace, summarize_trace, track_upstream, record_cache
 import uvicorn
 import marqo
-from fastapi import FastAPI, HTTPException, Query, Body
+from fastapi import FastAPI, HTTPException, Query, Body, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi_mcp import FastApiMCP
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel, Field, ConfigDict, create_model
 from typing import List, Optional, Dict, Any
 from enum import Enum
 from typing import ForwardRef
+STARTUP.mark("import_dependencies")
+
+logger = logging.getLogger(__name__)
 
 
 # --- Marqo client setup ---
-mq = marqo.Client(url="http://localhost:8882")
+MARQO_URL = os.environ.get("MARQO_URL", "http://localhost:8882")
 INDEX_NAME = "papers"
+DOCUMENT_CACHE_SIZE = 50_000
+TRACE_REQUEST_HEADER = "X-Trace-Upstream"
+TRACE_RESPONSE_HEADER = "X-Upstream-Trace"
+RRF_K = 60
+CANDIDATE_FACTOR = 3
+MAX_CANDIDATES = 300
+CENTRALITY_WEIGHT = 0.3
+LEXICAL_SEARCH_FIELDS = ["title", "fos_names"]
+QUERY_EMBEDDING_CACHE_SIZE = 10_000
+WARM_UP_ON_STARTUP = os.environ.get("WARM_UP_ON_STARTUP", "1") != "0"
+# Representative agent topics; the first one also makes Marqo load the model
+WARM_UP_QUERIES = [
+    "graph neural networks",
+    "deep learning for computer vision",
+    "natural language processing with transformers",
+    "reinforcement learning",
+    "database query optimization",
+    "distributed systems consensus",
+]
+GRAPH_BACKEND = os.environ.get("GRAPH_BACKEND", "marqo")
+CITATION_CANDIDATES = 1000
+DEFAULT_MAX_NODES = 500
+DEFAULT_TOP_K_PER_HOP = 50
+DEFAULT_DEADLINE_MS = 10_000
+TRAVERSAL_WORKERS = 32
+TRAVERSAL_IN_FLIGHT = 8
+FILTER_SPECIAL_CHARS = set('\\()[]{}:"^~*?!+/')
+MCP_PATH = "/mcp"
 
 
 # --- Utils ---
+class LRUCache:
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+
+document_cache = LRUCache(DOCUMENT_CACHE_SIZE)
+query_embedding_cache = LRUCache(QUERY_EMBEDDING_CACHE_SIZE)
+_marqo_index = None
+_marqo_lock = threading.Lock()
+
+
+def get_marqo_index():
+    # Created once, in the lifespan or on first use: building an Index sets up
+    # its HTTP client and may check the server version.
+    global _marqo_index
+    if _marqo_index is None:
+        with _marqo_lock:
+            if _marqo_index is None:
+                _marqo_index = marqo.Client(url=MARQO_URL).index(INDEX_NAME)
+    return _marqo_index
+
+
+def compact_document(doc):
+    # Only the fields the endpoints return are cached; a full Marqo document
+    # with its *_ngram arrays is several times larger
+    return {field: doc[field] for field in PaperLight.model_fields if field in doc}
+
+
 def fetch_paper_by_id(paper_id):
-    doc = mq.index(INDEX_NAME).get_document(str(paper_id))
-    return dict(doc) if doc else None
+    key = str(paper_id)
+    doc = document_cache.get(key)
+    record_cache("document", doc is not None)
+    if doc is None:
+        with track_upstream("marqo", "get_document"):
+            doc = get_marqo_index().get_document(key)
+        if not doc:
+            return None
+        doc = compact_document(doc)
+        document_cache.put(key, doc)
+    return dict(doc)
+
+
+def fetch_papers_by_ids(paper_ids):
+    # Cache lookups plus one batched Marqo call for the misses; returns {id: doc}
+    # for the documents that exist
+    docs, missing = {}, []
+    for pid in paper_ids:
+        doc = document_cache.get(str(pid))
+        record_cache("document", doc is not None)
+        if doc is not None:
+            docs[int(pid)] = dict(doc)
+        else:
+            missing.append(str(pid))
+    if not missing:
+        return docs
+    with track_upstream("marqo", "get_documents"):
+        res = get_marqo_index().get_documents(missing)
+    for doc in res.get('results', []):
+        if doc.get('_found', True) and doc.get('id') is not None:
+            doc = compact_document(doc)
+            document_cache.put(str(doc['id']), doc)
+            docs[int(doc['id'])] = dict(doc)
+    return docs
 
 
 def fetch_paper_by_title(paper_title):
-    search_res = mq.index(INDEX_NAME).search(
-        paper_title,
-        search_method=marqo.SearchMethods.TENSOR,
-        limit=1
-    )
+    search_res = tensor_search("search_title", paper_title, 1)
     if not search_res['hits']:
         return None
     return dict(search_res['hits'][0])
 
 
-def fetch_citations(paper_id: int, depth: int):
-    if depth <= 0:
-        return []
-    filter_str = f"references:({paper_id})"
-    res = mq.index(INDEX_NAME).search(
-        "",
-        search_method=marqo.SearchMethods.TENSOR,
-        limit=1000,
-        filter_string=filter_str
-    )
-    citations = []
-    for pap in res['hits']:
-        pid = pap.get('id')
-        if pid is None:
-            continue
-        pap_copy = fetch_paper_by_id(pid)
-        if pap_copy is not None:
-            pap_copy['cited_by'] = fetch_citations(pid, depth - 1)
-            citations.append(pap_copy)
-    return citations
-
-
-def fetch_origins(paper_id: int, depth: int):
-    if depth <= 0:
-        return []
+def citing_papers(paper_id, hop=0):
+    # The filter search already returns the full documents, no per-hit get_document
+    with track_upstream("marqo", "search_citations"):
+        res = get_marqo_index().search(
+            "*",
+            search_method=marqo.SearchMethods.LEXICAL,
+            limit=CITATION_CANDIDATES,
+            filter_string=f"references:({paper_id})"
+        )
+    return [{k: v for k, v in hit.items() if not k.startswith('_')} for hit in res['hits'] if hit.get('id') is not None]
+
+
+def referenced_papers(paper_id, hop=0):
     doc = fetch_paper_by_id(paper_id)
-    if not doc or "references" not in doc or not doc["references"]:
+    if not doc or not doc.get("references"):
         return []
-    origins = []
-    for rid in doc["references"]:
-        try:
-            ref = fetch_paper_by_id(rid)
-            if ref:
-                ref_copy = dict(ref)
-                ref_copy['cites'] = fetch_origins(ref_copy.get('id'), depth - 1)
-                origins.append(ref_copy)
-        except Exception:
-            continue
-    return origins
+    docs = fetch_papers_by_ids(doc["references"])
+    return [docs[int(rid)] for rid in doc["references"] if int(rid) in docs]
+
+
+def fetch_citations(paper_id: int, depth: int, budget=None):
+    return build_tree(paper_id, depth, 'cited_by', citing_papers, budget or TraversalBudget(), parallel=True)
+
+
+def fetch_origins(paper_id: int, depth: int, budget=None):
+    return build_tree(paper_id, depth, 'cites', referenced_papers, budget or TraversalBudget(), parallel=True)
+
+
+# --- Search planning ---
+search_executor = ThreadPoolExecutor(max_workers=8)
+
+
+def escape_filter_value(value) -> str:
+    return ''.join('\\' + ch if ch in FILTER_SPECIAL_CHARS else ch for ch in str(value).strip())
+
+
+def build_filter_string(min_year, max_year, min_citation, max_citation, publication_type,
+                        author_name=None, author_organization=None, venue_name=None, keywords=None):
+    clauses = [f'(year:[{min_year} TO {max_year}])', f'(n_citation:[{min_citation} TO {max_citation}])']
+    if publication_type is not PublicationType.All:
+        clauses.append(f'(doc_type:({publication_type.value}))')
+    for field, value in (('author_names_ngram', author_name), ('author_orgs_ngram', author_organization),
+                         ('venue_name_ngram', venue_name), ('fos_names_ngram', keywords)):
+        if value is not None and value.strip():
+            clauses.append(f'({field}:({escape_filter_value(value)}))')
+    return ' AND '.join(clauses)
+
+
+def plan_search(research_topic: str, has_filters: bool, mode: 'SearchMode') -> str:
+    # Pure-filter queries skip embedding entirely; a topic with explicit filters
+    # gets both keyword and semantic retrieval fused, a bare topic stays tensor-only.
+    if mode is not SearchMode.auto:
+        return mode.value
+    if not research_topic:
+        return 'filter'
+    return 'hybrid' if has_filters else 'tensor'
+
+
+def marqo_search(call_type, q, search_method, limit, filter_string, **kwargs):
+    with track_upstream("marqo", call_type):
+        return get_marqo_index().search(
+            q,
+            search_method=search_method,
+            limit=limit,
+            offset=0,
+            filter_string=filter_string,
+            **kwargs
+        )
+
+
+def normalize_query(text):
+    return " ".join(text.casefold().split())
+
+
+def embed_query(text):
+    # Agents repeat the same topics and titles, so query vectors are cached by
+    # their normalized text and repeat searches skip the embedding step. They
+    # are kept as float32 arrays (about 3 KB for 768 dimensions instead of about
+    # 25 KB as a list of floats).
+    key = normalize_query(text)
+    vector = query_embedding_cache.get(key)
+    record_cache("query_embedding", vector is not None)
+    if vector is None:
+        with track_upstream("marqo", "embed_query"):
+            res = get_marqo_index().embed(content=[key], content_type=marqo.enums.EmbedContentType.Query)
+        vector = array('f', res['embeddings'][0])
+        query_embedding_cache.put(key, vector)
+    return vector
+
+
+def tensor_search(call_type, text, limit, filter_string=None):
+    context = {"tensor": [{"vector": embed_query(text).tolist(), "weight": 1}]}
+    return marqo_search(call_type, None, marqo.SearchMethods.TENSOR, limit, filter_string, context=context)
+
+
+def warm_up(queries=WARM_UP_QUERIES):
+    # Loads the model inside Marqo and fills the query embedding cache before
+    # the first real request; stops at the first failure.
+    try:
+        for query in queries:
+            tensor_search("warm_up", query, 1)
+        marqo_search("warm_up", "*", marqo.SearchMethods.LEXICAL, 1, None)
+    except Exception as e:
+        logger.warning(f"Marqo warm-up failed: {e}")
+        return False
+    return True
+
+
+def timed_call(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def run_in_context(fn, *args, **kwargs):
+    # Submits to the search pool with the caller's context so upstream calls
+    # still land in the request trace.
+    return search_executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def reciprocal_rank_fusion(hit_lists):
+    scores, docs = {}, {}
+    for hits in hit_lists:
+        for rank, hit in enumerate(hits):
+            key = hit.get('_id', hit.get('id'))
+            scores[key] = scores.get(key, 0.0) + 1.0 / (RRF_K + rank + 1)
+            docs.setdefault(key, hit)
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    return [docs[key] for key in ranked], [scores[key] for key in ranked]
+
+
+def rerank_by_centrality_scores(hits, relevance):
+    # Blend relevance with the paper's PageRank percentile. Fused scores only
+    # span a narrow band (1/61 to 1/91 for 30 candidates of one list), so they
+    # are min-max normalized over the candidates first.
+    analytics = get_analytics()
+    low, high = (min(relevance), max(relevance)) if relevance else (0.0, 0.0)
+    blended = []
+    for hit, rel in zip(hits, relevance):
+        index = analytics.paper_index(hit.get('id'))
+        centrality = analytics.influence(index)['pagerank_percentile'] / 100 if index is not None else 0.0
+        rel = (rel - low) / (high - low) if high > low else 1.0
+        blended.append((1 - CENTRALITY_WEIGHT) * rel + CENTRALITY_WEIGHT * centrality)
+    order = sorted(range(len(hits)), key=lambda i: blended[i], reverse=True)
+    return [hits[i] for i in order]
+
+
+# --- Graph traversal backends ---
+class TraversalBudget:
+    # Caps a traversal by the number of returned papers, the neighbours kept per
+    # parent (best first by order_by) and wall-clock time. Whatever was
+    # collected when a limit is hit is returned, with the reasons in info().
+    def __init__(self, max_nodes=DEFAULT_MAX_NODES, top_k_per_hop=DEFAULT_TOP_K_PER_HOP, order_by='n_citation',
+                 deadline_ms=DEFAULT_DEADLINE_MS):
+        self.max_nodes = max_nodes
+        self.top_k_per_hop = top_k_per_hop
+        self.order_by = order_by
+        self.deadline_ms = deadline_ms
+        self.start = time.perf_counter()
+        self.n_nodes = 0
+        self.n_pruned = 0
+        self.truncated_by = set()
+
+    def remaining_seconds(self):
+        return max(0.0, self.deadline_ms / 1000 - (time.perf_counter() - self.start))
+
+    def truncate(self, reason, n_pruned=0):
+        self.truncated_by.add(reason)
+        self.n_pruned += n_pruned
+
+    def exhausted(self, check_deadline=True):
+        if check_deadline and self.remaining_seconds() <= 0:
+            self.truncate('deadline')
+        elif self.n_nodes >= self.max_nodes:
+            self.truncate('max_nodes')
+        else:
+            return False
+        return True
+
+    def take(self, candidates):
+        # Keeps the best top_k_per_hop candidates that still fit into max_nodes
+        ranked = sorted(candidates, key=lambda p: p.get(self.order_by) if p.get(self.order_by) is not None else -1,
+                        reverse=True)
+        if len(ranked) > self.top_k_per_hop:
+            self.truncate('top_k_per_hop', len(ranked) - self.top_k_per_hop)
+            ranked = ranked[:self.top_k_per_hop]
+        room = self.max_nodes - self.n_nodes
+        if len(ranked) > room:
+            self.truncate('max_nodes', len(ranked) - room)
+            ranked = ranked[:room]
+        self.n_nodes += len(ranked)
+        return ranked
+
+    def info(self):
+        return {
+            'n_nodes': self.n_nodes,
+            'truncated': bool(self.truncated_by),
+            'truncated_by': sorted(self.truncated_by),
+            'n_pruned': self.n_pruned,
+            'elapsed_ms': round((time.perf_counter() - self.start) * 1000, 3),
+            'max_nodes': self.max_nodes,
+            'top_k_per_hop': self.top_k_per_hop,
+            'order_by': self.order_by,
+            'deadline_ms': self.deadline_ms,
+        }
+
+
+# Own pool, so traversal fan-out does not queue in front of hybrid searches
+traversal_executor = ThreadPoolExecutor(max_workers=TRAVERSAL_WORKERS)
+
+
+def gather_neighbours(neighbours, paper_ids, hop, budget):
+    # Looks up one hop with at most TRAVERSAL_IN_FLIGHT lookups per request
+    # running at once. Nothing new starts after the deadline; lookups not
+    # finished by then come back as None.
+    results = [None] * len(paper_ids)
+    pending = {}
+    next_index = 0
+    while next_index < len(paper_ids) or pending:
+        while next_index < len(paper_ids) and len(pending) < TRAVERSAL_IN_FLIGHT and budget.remaining_seconds() > 0:
+            pending[traversal_executor.submit(contextvars.copy_context().run, neighbours, paper_ids[next_index], hop)] = next_index
+            next_index += 1
+        if not pending:
+            break
+        done, _ = wait(pending, timeout=budget.remaining_seconds(), return_when=FIRST_COMPLETED)
+        if not done:
+            break
+        for future in done:
+            results[pending.pop(future)] = future.result()
+    if next_index < len(paper_ids) or pending:
+        budget.truncate('deadline')
+    return results
+
+
+def build_tree(paper_id, depth, key, neighbours, budget, parallel=False):
+    # Breadth-first, so a budget that runs out cuts the farthest hops first;
+    # neighbours(paper_id, hop) returns the candidate papers one hop further.
+    # In-memory (non-parallel) neighbours are assembled even past the deadline.
+    tree = []
+    frontier = [(paper_id, tree)]
+    for hop in range(depth):
+        if not frontier or budget.exhausted(check_deadline=parallel):
+            break
+        ids = [pid for pid, _ in frontier]
+        results = gather_neighbours(neighbours, ids, hop, budget) if parallel else [neighbours(pid, hop) for pid in ids]
+        next_frontier = []
+        for (_, children), candidates in zip(frontier, results):
+            for paper in budget.take(candidates or []):
+                node = dict(paper)
+                node[key] = []
+                children.append(node)
+                next_frontier.append((node['id'], node[key]))
+        frontier = next_frontier
+    return tree
+
+
+class MarqoGraphBackend:
+    # Multi-hop traversal through Marqo filter searches and batched get_documents
+    name = "marqo"
+
+    def literature_graph(self, paper_id, successor_depth=0, predecessor_depth=0, budget=None):
+        # References go first: they are bounded per paper, while citations of a
+        # famous paper could use up a shared budget on their own.
+        budget = budget or TraversalBudget()
+        cites = fetch_origins(paper_id, predecessor_depth, budget)
+        return {'cited_by': fetch_citations(paper_id, successor_depth, budget), 'cites': cites}
+
+
+class CitationTreeBackend:
+    # Backends whose network answers get_citation_trees (per-hop neighbour maps)
+    name = None
+    network = None
+
+    def literature_graph(self, paper_id, successor_depth=0, predecessor_depth=0, budget=None):
+        # Per-hop top-k and ordering run inside the queries, which stop expanding
+        # once max_nodes is reached; the deadline becomes the query timeout.
+        # Assembly then records the same truncations as the Marqo backend.
+        budget = budget or TraversalBudget()
+        with track_upstream(self.name, "citation_trees"):
+            trees = self.network.get_citation_trees(paper_id, successor_depth, predecessor_depth,
+                                                    fanout=budget.top_k_per_hop, order_by=budget.order_by,
+                                                    timeout=budget.remaining_seconds(),
+                                                    max_nodes=budget.max_nodes - budget.n_nodes)
+        if trees.pop("timed_out", False):
+            # The hops finished before the timeout are still returned
+            budget.truncate('deadline')
+
+        def neighbours(hops):
+            def lookup(pid, hop):
+                total, papers = hops[hop].get(pid, (0, [])) if hop < len(hops) else (0, [])
+                if total > len(papers):
+                    budget.truncate('top_k_per_hop', total - len(papers))
+                return papers
+            return lookup
+
+        depths = {'cites': predecessor_depth, 'cited_by': successor_depth}
+        return {key: build_tree(paper_id, depths[key], key, neighbours(trees[key]), budget) for key in ('cites', 'cited_by')}
+
+    def close(self):
+        self.network.close()
+
+
+class Neo4jGraphBackend(CitationTreeBackend):
+    # One Cypher query per hop over the pooled driver
+    name = "neo4j"
+
+    def __init__(self):
+        # Imported here so that Marqo-only deployments do not need the neo4j driver
+        from graph_db import Neo4jCitationNetwork, NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
+        self.network = Neo4jCitationNetwork(
+            uri=os.environ.get("NEO4J_URI", NEO4J_URI),
+            user=os.environ.get("NEO4J_USER", NEO4J_USER),
+            password=os.environ.get("NEO4J_PASSWORD", NEO4J_PASSWORD),
+            database=os.environ.get("NEO4J_DATABASE", "papers"),
+        )
+
+
+class SQLiteGraphBackend(CitationTreeBackend):
+    # Embedded single-file graph built by sqlite_graph.py, no database server needed
+    name = "sqlite"
+
+    def __init__(self):
+        from sqlite_graph import SQLiteCitationNetwork, SQLITE_PATH
+        path = os.environ.get("SQLITE_GRAPH_PATH", SQLITE_PATH)
+        if not os.path.exists(path):
+            raise HTTPException(status_code=503, detail=f"SQLite graph not found at '{path}', run sqlite_graph.py first")
+        self.network = SQLiteCitationNetwork(path)
+
+
+GRAPH_BACKENDS = {"marqo": MarqoGraphBackend, "neo4j": Neo4jGraphBackend, "sqlite": SQLiteGraphBackend}
+_graph_backend = None
+_graph_backend_lock = threading.Lock()
+
+
+def get_graph_backend():
+    global _graph_backend
+    if _graph_backend is None:
+        with _graph_backend_lock:
+            if _graph_backend is None:
+                if GRAPH_BACKEND not in GRAPH_BACKENDS:
+                    raise HTTPException(status_code=500, detail=f"Unknown GRAPH_BACKEND '{GRAPH_BACKEND}', expected one of {sorted(GRAPH_BACKENDS)}")
+                _graph_backend = GRAPH_BACKENDS[GRAPH_BACKEND]()
+    return _graph_backend
+
+
+_analytics = None
+_analytics_lock = threading.Lock()
+
+
+def get_analytics():
+    global _analytics
+    if _analytics is None:
+        with _analytics_lock:
+            if _analytics is None:
+                # numpy and scipy are only loaded once analytics are needed
+                from graph_analytics import GraphAnalytics, ANALYTICS_PATH
+                try:
+                    _analytics = GraphAnalytics(ANALYTICS_PATH)
+                except FileNotFoundError:
+                    raise HTTPException(status_code=503, detail=f"Graph analytics not found at '{ANALYTICS_PATH}', run graph_analytics.py first")
+    return _analytics
+
+
+def count_nodes(paper: dict) -> int:
+    return 1 + sum(count_nodes(p) for key in ('cites', 'cited_by') for p in (paper.get(key) or []))
+
+
+def traversal_response(root, budget, operation_id):
+    TRAVERSAL_NODES.observe(count_nodes(root), operation_id)
+    for reason in budget.truncated_by:
+        TRAVERSAL_TRUNCATIONS.inc(operation_id, reason)
+    return PaperGraphResponse(**root, traversal=TraversalInfo(**budget.info()))
 
 
 # --- Pydantic Models ---
@@ -91,6 +539,14 @@ class PublicationType(Enum):
     All = 'All'
 
 
+class SearchMode(Enum):
+    auto = 'auto'
+    filter = 'filter'
+    lexical = 'lexical'
+    tensor = 'tensor'
+    hybrid = 'hybrid'
+
+
 class Paper(BaseModel):
     id: int
     title: str
@@ -124,14 +580,72 @@ class PaperLight(BaseModel):
     venue_name: Optional[str] = None
 
 
-PaperWithRefs = create_nested_model(Paper, 3)
 PaperLightWithRefs = create_nested_model(PaperLight, 3)
 
 
+class TraversalOrder(Enum):
+    n_citation = 'n_citation'
+    year = 'year'
+
+
+class TraversalInfo(BaseModel):
+    n_nodes: int
+    truncated: bool
+    truncated_by: List[str] = Field(default_factory=list, description="Limits that cut the traversal: max_nodes, top_k_per_hop, deadline")
+    n_pruned: int = Field(0, description="Neighbours dropped by top_k_per_hop or max_nodes (lookups cut by the deadline are not counted)")
+    elapsed_ms: float
+    max_nodes: int
+    top_k_per_hop: int
+    order_by: str
+    deadline_ms: int
+
+
+PaperGraphResponse = create_model(
+    "PaperGraphResponse", __base__=PaperLightWithRefs, traversal=(Optional[TraversalInfo], None)
+)
+
+
+class InfluenceMeasure(Enum):
+    pagerank = 'pagerank'
+    in_field = 'in_field'
+
+
+class RelationType(Enum):
+    co_citation = 'co_citation'
+    bibliographic_coupling = 'bibliographic_coupling'
+
+
+class RankedPaper(PaperLight):
+    score: float
+
+
+class RankedPaperResponse(BaseModel):
+    results: List[RankedPaper]
+    cnt_result: int
+
+
+class PaperInfluenceResponse(BaseModel):
+    paper: PaperLight
+    pagerank: float
+    pagerank_rank: int
+    pagerank_percentile: float
+    in_field_pagerank: float
+    primary_field: str
+    n_cited_in_corpus: int
+
+
+class AuthorCollaborationResponse(BaseModel):
+    author_id: int
+    n_coauthors: int
+    n_papers: int
+
+
 class PaperSearchResponse(BaseModel):
     results: List[PaperLight]
     cnt_result: int
     time_miliseconds: int
+    search_plan: Optional[str] = None
+    stage_latency_ms: Optional[Dict[str, float]] = None
 
 class StatsResponse(BaseModel):
     total_papers: int
@@ -141,9 +655,33 @@ class StatsResponse(BaseModel):
 
 class HealthResponse(BaseModel):
     status: str
+    marqo: Optional[str] = None
+
+
+class ReadyResponse(BaseModel):
+    status: str
+    startup_ms: float
+    marqo: Optional[str] = None
+
+STARTUP.mark("define_models")
+
 
 # --- FastAPI App ---
-app = FastAPI(title="Papers and Citation Network FastAPI Backend", description="API for searching academic papers.")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    with STARTUP.phase("marqo_client"):
+        get_marqo_index()
+    if WARM_UP_ON_STARTUP:
+        with STARTUP.phase("warm_up"):
+            warm_up()
+    STARTUP.finish()
+    yield
+    if _graph_backend is not None and hasattr(_graph_backend, "close"):
+        _graph_backend.close()
+
+
+app = FastAPI(title="Papers and Citation Network FastAPI Backend", description="API for searching academic papers.",
+              lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -151,12 +689,75 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[TRACE_RESPONSE_HEADER],
 )
 
+
+@app.middleware("http")
+async def mount_mcp_on_first_use(request: Request, call_next):
+    # The MCP routes only exist once the server is set up, so the first /mcp
+    # request builds it before routing
+    if request.url.path.startswith(MCP_PATH):
+        get_mcp()
+    return await call_next(request)
+
+
+@app.middleware("http")
+async def observe_requests(request: Request, call_next):
+    trace_requested = request.headers.get(TRACE_REQUEST_HEADER, "").lower() in ("1", "true", "yes")
+    trace, token = start_trace()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        elapsed = time.perf_counter() - start
+        route = request.scope.get("route")
+        operation_id = getattr(route, "operation_id", None) or "unmatched"
+        REQUEST_LATENCY.observe(elapsed, operation_id, status)
+        end_trace(token)
+    if trace_requested:
+        summary = summarize_trace(trace)
+        summary["request_ms"] = round(elapsed * 1000, 3)
+        summary["upstream_ms"] = round(sum(call["ms"] for call in trace), 3)
+        response.headers[TRACE_RESPONSE_HEADER] = json.dumps(summary, separators=(",", ":"))
+    return response
+
+
 # --- Endpoints ---
 @app.get("/health", response_model=HealthResponse, operation_id="health_check")
 def health():
-    return {"status": "ok"}
+    try:
+        with track_upstream("marqo", "health"):
+            get_marqo_index().health()
+    except Exception as e:
+        return JSONResponse(status_code=503, content={"status": "unavailable", "marqo": f"unreachable: {e}"})
+    return {"status": "ok", "marqo": "ok"}
+
+
+@app.get("/ready", response_model=ReadyResponse, operation_id="readiness_check")
+def ready():
+    # Requests are only served after the lifespan startup, so this checks the
+    # Marqo dependency
+    report = STARTUP.report()
+    try:
+        with track_upstream("marqo", "health"):
+            get_marqo_index().health()
+    except Exception as e:
+        return JSONResponse(status_code=503, content={"status": "unavailable", "startup_ms": report["total_ms"], "marqo": f"unreachable: {e}"})
+    return {"status": "ready", "startup_ms": report["total_ms"], "marqo": "ok"}
+
+
+@app.get("/startup_profile", operation_id="get_startup_profile")
+def startup_profile():
+    # Milliseconds per startup phase: imports, model and route definitions, lifespan init
+    return STARTUP.report()
+
+
+@app.get("/metrics", response_class=PlainTextResponse, operation_id="get_metrics")
+def metrics():
+    return PlainTextResponse(REGISTRY.expose(), media_type="text/plain; version=0.0.4")
 
 
 @app.get(
@@ -177,92 +778,146 @@ def search_papers(
     author_organization: Optional[str] = None,
     venue_name: Optional[str] = None,
     keywords: Optional[str] = None,
+    search_mode: SearchMode = Query(SearchMode.auto, description="auto picks filter-only, tensor or hybrid (lexical+tensor with rank fusion) from the given inputs"),
+    rerank_by_centrality: bool = Query(False, description="Rerank results by blending relevance with citation-graph PageRank"),
 ):
-    research_topic = '' if research_topic is None else research_topic
+    start = time.perf_counter()
+    stages = {}
+    research_topic = '' if research_topic is None else research_topic.strip()
+    # Blank text filters are dropped by build_filter_string, so they must not make the search hybrid either
+    has_filters = any(v is not None for v in (min_year, max_year, min_citation, max_citation, publication_type)) or any(
+        v is not None and v.strip() for v in (author_name, author_organization, venue_name, keywords)
+    )
     min_year = 1930 if min_year is None else min_year
     max_year = 2021 if max_year is None else max_year
     min_citation = 0 if min_citation is None else min_citation
     max_citation = 1_000_000 if max_citation is None else max_citation
     publication_type = PublicationType.All if publication_type is None else publication_type
 
-    filter_string = f'(year:[{min_year} TO {max_year}])'
-    filter_string += f' AND (n_citation:[{min_citation} TO {max_citation}])'
-    if publication_type is not PublicationType.All:
-        filter_string += f' AND (doc_type:({publication_type.value}))'
-    if author_name is not None:
-        filter_string += f' AND (author_names_ngram:({author_name}))'
-    if author_organization is not None:
-        filter_string += f' AND (author_orgs_ngram:({author_organization}))'
-    if venue_name is not None:
-        filter_string += f' AND (venue_name_ngram:({venue_name}))'
-    if keywords is not None:
-        filter_string += f' AND (fos_names_ngram:({keywords}))'
-
-    res = mq.index(INDEX_NAME).search(
-        research_topic, 
-        search_method=marqo.SearchMethods.TENSOR,
-        limit=limit, 
-        offset=0, 
-        filter_string=filter_string
-    )
+    filter_string = build_filter_string(min_year, max_year, min_citation, max_citation, publication_type,
+                                        author_name, author_organization, venue_name, keywords)
+    plan = plan_search(research_topic, has_filters, search_mode)
+    if plan != 'filter' and not research_topic:
+        raise HTTPException(status_code=422, detail=f"search_mode '{plan}' requires a research_topic")
+    n_candidates = min(limit * CANDIDATE_FACTOR, MAX_CANDIDATES) if plan == 'hybrid' or rerank_by_centrality else limit
+    stages['plan'] = (time.perf_counter() - start) * 1000
+
+    if plan == 'filter':
+        t = time.perf_counter()
+        res = marqo_search("search_filter", "*", marqo.SearchMethods.LEXICAL, n_candidates, filter_string)
+        stages['filter'] = (time.perf_counter() - t) * 1000
+        hit_lists = [res['hits']]
+    elif plan == 'hybrid':
+        lexical = run_in_context(timed_call, marqo_search, "search_lexical", research_topic, marqo.SearchMethods.LEXICAL,
+                                 n_candidates, filter_string, searchable_attributes=LEXICAL_SEARCH_FIELDS)
+        tensor = run_in_context(timed_call, tensor_search, "search_tensor", research_topic, n_candidates, filter_string)
+        (lexical_res, stages['lexical']), (tensor_res, stages['tensor']) = lexical.result(), tensor.result()
+        hit_lists = [lexical_res['hits'], tensor_res['hits']]
+    else:
+        t = time.perf_counter()
+        if plan == 'lexical':
+            res = marqo_search("search_lexical", research_topic, marqo.SearchMethods.LEXICAL, n_candidates, filter_string,
+                               searchable_attributes=LEXICAL_SEARCH_FIELDS)
+        else:
+            res = tensor_search("search_tensor", research_topic, n_candidates, filter_string)
+        stages[plan] = (time.perf_counter() - t) * 1000
+        hit_lists = [res['hits']]
+
+    t = time.perf_counter()
+    hits, relevance = reciprocal_rank_fusion(hit_lists)
+    stages['fusion'] = (time.perf_counter() - t) * 1000
+    if rerank_by_centrality:
+        t = time.perf_counter()
+        try:
+            hits = rerank_by_centrality_scores(hits, relevance)
+            stages['rerank'] = (time.perf_counter() - t) * 1000
+        except HTTPException as e:
+            # Without analytics the search still answers, in relevance order
+            if e.status_code != 503:
+                raise
+            logger.warning(f"Centrality rerank skipped: {e.detail}")
+            plan += '+rerank_skipped'
+    hits = hits[:limit]
+
+    total_ms = (time.perf_counter() - start) * 1000
+    stages['total'] = total_ms
     return PaperSearchResponse(
-        results=res['hits'], 
-        cnt_result=len(res['hits']), 
-        time_miliseconds=res['processingTimeMs']
+        results=hits, 
+        cnt_result=len(hits), 
+        time_miliseconds=int(total_ms),
+        search_plan=plan,
+        stage_latency_ms={k: round(v, 3) for k, v in stages.items()}
     )
 
 
 @app.get(
     "/get_cited_by_paper", 
-    response_model=PaperLightWithRefs, 
+    response_model=PaperGraphResponse, 
     operation_id="get_cited_by_paper",
     summary='Get papers that cite a specific paper.'
 )
 def cited_by(
     paper_title: str = Query(..., description="Title of the paper to search for"),
-    successor_hop_length: int = Query(1, ge=1, le=3, description="Number of citation hops (1-3)")
+    successor_hop_length: int = Query(1, ge=1, le=3, description="Number of citation hops (1-3)"),
+    max_nodes: int = Query(DEFAULT_MAX_NODES, ge=1, le=10_000, description="Maximum number of papers returned besides the root"),
+    top_k_per_hop: int = Query(DEFAULT_TOP_K_PER_HOP, ge=1, le=CITATION_CANDIDATES, description="Neighbours kept per paper and hop, best first by order_by"),
+    order_by: TraversalOrder = Query(TraversalOrder.n_citation, description="Ranking used to pick the top_k_per_hop neighbours"),
+    deadline_ms: int = Query(DEFAULT_DEADLINE_MS, ge=100, le=60_000, description="Wall-clock budget; a partial graph is returned when it runs out")
 ):
+    # Started before the title lookup so deadline_ms covers the whole request
+    budget = TraversalBudget(max_nodes, top_k_per_hop, order_by.value, deadline_ms)
     root = fetch_paper_by_title(paper_title)
     if not root:
         raise HTTPException(status_code=404, detail=f"Paper with title '{paper_title}' not found")
-    root['cited_by'] = fetch_citations(root.get('id'), successor_hop_length)
-    return PaperLightWithRefs(**root)
+    root['cited_by'] = get_graph_backend().literature_graph(root.get('id'), successor_depth=successor_hop_length, budget=budget)['cited_by']
+    return traversal_response(root, budget, "get_cited_by_paper")
 
 
 @app.get(
     "/get_rooted_in_paper", 
-    response_model=PaperLightWithRefs, 
+    response_model=PaperGraphResponse, 
     operation_id="get_rooted_in_paper",
     summary='Get papers that a specific paper is rooted in (references).'
 )
 def rooted_in(
     paper_title: str = Query(..., description="Title of the paper to search for"),
-    predecessor_hop_length: int = Query(1, ge=1, le=3, description="Number of reference hops (1-3)")
+    predecessor_hop_length: int = Query(1, ge=1, le=3, description="Number of reference hops (1-3)"),
+    max_nodes: int = Query(DEFAULT_MAX_NODES, ge=1, le=10_000, description="Maximum number of papers returned besides the root"),
+    top_k_per_hop: int = Query(DEFAULT_TOP_K_PER_HOP, ge=1, le=CITATION_CANDIDATES, description="Neighbours kept per paper and hop, best first by order_by"),
+    order_by: TraversalOrder = Query(TraversalOrder.n_citation, description="Ranking used to pick the top_k_per_hop neighbours"),
+    deadline_ms: int = Query(DEFAULT_DEADLINE_MS, ge=100, le=60_000, description="Wall-clock budget; a partial graph is returned when it runs out")
 ):
+    budget = TraversalBudget(max_nodes, top_k_per_hop, order_by.value, deadline_ms)
     root = fetch_paper_by_title(paper_title)
     if not root:
         raise HTTPException(status_code=404, detail=f"Paper with title '{paper_title}' not found")
-    root['cites'] = fetch_origins(root.get('id'), predecessor_hop_length)
-    return PaperLightWithRefs(**root)
+    root['cites'] = get_graph_backend().literature_graph(root.get('id'), predecessor_depth=predecessor_hop_length, budget=budget)['cites']
+    return traversal_response(root, budget, "get_rooted_in_paper")
 
 
 @app.get(
     "/get_literature_graph", 
-    response_model=PaperLightWithRefs, 
+    response_model=PaperGraphResponse, 
     operation_id="get_literature_graph",
     summary='Get the literature graph of a specific paper, this includes both references (prior research) and citations (build on top).'
 )
 def literature_graph(
     paper_title: str = Query(..., description="Title of the paper to search for"),
     predecessor_hop_length: int = Query(1, ge=1, le=3, description="Number of reference hops (1-3)"),
-    successor_hop_length: int = Query(1, ge=1, le=3, description="Number of citation hops (1-3)")
+    successor_hop_length: int = Query(1, ge=1, le=3, description="Number of citation hops (1-3)"),
+    max_nodes: int = Query(DEFAULT_MAX_NODES, ge=1, le=10_000, description="Maximum number of papers returned besides the root"),
+    top_k_per_hop: int = Query(DEFAULT_TOP_K_PER_HOP, ge=1, le=CITATION_CANDIDATES, description="Neighbours kept per paper and hop, best first by order_by"),
+    order_by: TraversalOrder = Query(TraversalOrder.n_citation, description="Ranking used to pick the top_k_per_hop neighbours"),
+    deadline_ms: int = Query(DEFAULT_DEADLINE_MS, ge=100, le=60_000, description="Wall-clock budget; a partial graph is returned when it runs out")
 ):
+    budget = TraversalBudget(max_nodes, top_k_per_hop, order_by.value, deadline_ms)
     root = fetch_paper_by_title(paper_title)
     if not root:
         raise HTTPException(status_code=404, detail=f"Paper with title '{paper_title}' not found")
-    root['cites'] = fetch_origins(root.get('id'), predecessor_hop_length)
-    root['cited_by'] = fetch_citations(root.get('id'), successor_hop_length)
-    return PaperLightWithRefs(**root)
+    graph = get_graph_backend().literature_graph(root.get('id'), successor_hop_length, predecessor_hop_length, budget)
+    root['cites'] = graph['cites']
+    root['cited_by'] = graph['cited_by']
+    return traversal_response(root, budget, "get_literature_graph")
 
 
 @app.get(
@@ -291,10 +946,88 @@ def get_paper_by_title(paper_title: str):
     return res
 
 
+def ranked_papers(ranking):
+    docs = fetch_papers_by_ids([pid for pid, _ in ranking])
+    results = [RankedPaper(**docs[pid], score=score) for pid, score in ranking if pid in docs]
+    return RankedPaperResponse(results=results, cnt_result=len(results))
+
+
+def analytics_index(analytics, paper_title):
+    root = fetch_paper_by_title(paper_title)
+    if not root:
+        raise HTTPException(status_code=404, detail=f"Paper with title '{paper_title}' not found")
+    index = analytics.paper_index(root.get('id'))
+    if index is None:
+        raise HTTPException(status_code=404, detail=f"Paper '{root.get('title')}' is not in the citation graph analytics")
+    return root, index
+
+
+@app.get(
+    "/get_influential_papers",
+    response_model=RankedPaperResponse,
+    operation_id="get_influential_papers",
+    summary='Get the most influential papers by PageRank over the citation graph, overall or within a field of study.'
+)
+def influential_papers(
+    limit: int = Query(10, ge=1, le=100),
+    measure: InfluenceMeasure = Query(InfluenceMeasure.pagerank, description="pagerank (whole graph) or in_field (citations within the paper's primary field)"),
+    field_of_study: Optional[str] = Query(None, description="Restrict to papers whose primary field of study matches exactly, e.g. 'Computer vision'")
+):
+    analytics = get_analytics()
+    field = None
+    if field_of_study is not None:
+        field = analytics.field_code(field_of_study)
+        if field is None:
+            raise HTTPException(status_code=404, detail=f"Field of study '{field_of_study}' not found")
+    return ranked_papers(analytics.top_papers(measure.value, limit, field))
+
+
+@app.get(
+    "/get_related_papers",
+    response_model=RankedPaperResponse,
+    operation_id="get_related_papers",
+    summary='Get papers related to a specific paper by co-citation (cited together with it) or bibliographic coupling (sharing its references).'
+)
+def related_papers(
+    paper_title: str = Query(..., description="Title of the paper to search for"),
+    relation: RelationType = Query(RelationType.co_citation, description="co_citation or bibliographic_coupling"),
+    limit: int = Query(10, ge=1, le=100)
+):
+    analytics = get_analytics()
+    _, index = analytics_index(analytics, paper_title)
+    return ranked_papers(analytics.related_papers(index, relation.value, limit))
+
+
+@app.get(
+    "/get_paper_influence",
+    response_model=PaperInfluenceResponse,
+    operation_id="get_paper_influence",
+    summary='Get influence metrics of a specific paper: PageRank, rank, percentile and in-field influence.'
+)
+def paper_influence(paper_title: str = Query(..., description="Title of the paper to search for")):
+    analytics = get_analytics()
+    root, index = analytics_index(analytics, paper_title)
+    return PaperInfluenceResponse(paper=PaperLight(**root), **analytics.influence(index))
+
+
+@app.get(
+    "/get_author_collaboration",
+    response_model=AuthorCollaborationResponse,
+    operation_id="get_author_collaboration",
+    summary='Get the number of distinct co-authors and papers of an author, by author id (see author_ids of papers).'
+)
+def author_collaboration(author_id: int):
+    res = get_analytics().author_collaboration(author_id)
+    if res is None:
+        raise HTTPException(status_code=404, detail="Author not found")
+    return res
+
+
 @app.get("/get_stats", response_model=StatsResponse, operation_id="get_stats")
 def get_stats():
     # Example: count, by year, by author, by venue (stubbed, can be improved)
-    res = mq.index(INDEX_NAME).search("", limit=0, offset=0)
+    with track_upstream("marqo", "search_stats"):
+        res = get_marqo_index().search("", limit=0, offset=0)
     total = res["hits_total_count"]
     # For demo: not aggregating by year/author/venue
     return {"total_papers": total}
@@ -310,26 +1043,53 @@ def get_fields():
 
 @app.get("/get_index_info", operation_id="get_index_info")
 def get_index_info():
-    return mq.index(INDEX_NAME).get_stats()
-
-
-mcp = FastApiMCP(
-    app, 
-    name="Papers and Citation Network API MCP",
-    description="Papers and Citation Network API MCP",
-    # base_url="http://localhost:8888/mcp",
-    describe_all_responses=False,
-    describe_full_response_schema=False,
-    exclude_operations=[
-        "health_check", 
-        "get_paper_by_id", 
-        "get_paper_by_title", 
-        "get_stats", 
-        "get_fields", 
-        "get_index_info"
-    ]
-)
-mcp.mount()
+    with track_upstream("marqo", "get_stats"):
+        return get_marqo_index().get_stats()
+
+
+STARTUP.mark("define_routes")
+
+
+def setup_mcp(app: FastAPI):
+    # Importing fastapi_mcp and generating the tool schemas for every route
+    # would be the largest part of the startup cost, so get_mcp runs this on
+    # the first MCP request instead.
+    from fastapi_mcp import FastApiMCP
+    mcp = FastApiMCP(
+        app, 
+        name="Papers and Citation Network API MCP",
+        description="Papers and Citation Network API MCP",
+        # base_url="http://localhost:8888/mcp",
+        describe_all_responses=False,
+        describe_full_response_schema=False,
+        exclude_operations=[
+            "health_check", 
+            "readiness_check",
+            "get_startup_profile",
+            "get_metrics", 
+            "get_paper_by_id", 
+            "get_paper_by_title", 
+            "get_stats", 
+            "get_fields", 
+            "get_index_info"
+        ]
+    )
+    mcp.mount(mount_path=MCP_PATH)
+    return mcp
+
+
+_mcp = None
+_mcp_lock = threading.Lock()
+
+
+def get_mcp():
+    global _mcp
+    if _mcp is None:
+        with _mcp_lock:
+            if _mcp is None:
+                with STARTUP.phase("mcp_setup"):
+                    _mcp = setup_mcp(app)
+    return _mcp
 
 
 if __name__ == "__main__":
@@ -0,0 +1,224 @@
+import ijson
+import time
+import logging
+import numpy as np
+import scipy.sparse as sp
+from tqdm import tqdm
+
+
+logger = logging.getLogger(__name__)
+
+DATA_PATH = 'data/dblp.filtered.y2000_r9_c5.json'
+ANALYTICS_PATH = 'data/graph_analytics.npz'
+DEFAULT_TOP_K = 20
+DEFAULT_DAMPING = 0.85
+BLOCK_SIZE = 20_000
+
+
+# --- Offline job: citation graph -> compact analytics arrays ---
+def load_citation_graph(data_path=DATA_PATH):
+    ids, refs, fos, authors = [], [], [], []
+    with open(data_path, 'r', encoding='utf-8') as f:
+        for entry in tqdm(ijson.items(f, 'item'), desc="Reading papers"):
+            ids.append(int(entry['id']))
+            refs.append([int(r) for r in entry.get('references') or []])
+            names = entry.get('fos_names') or []
+            weights = [float(w) if w is not None else 0.0 for w in entry.get('fos_ws') or []]
+            # Primary field of study: the one with the highest weight
+            fos.append(names[int(np.argmax(weights))] if names and len(weights) == len(names) else (names[0] if names else ''))
+            authors.append([int(a) for a in entry.get('author_ids') or [] if a not in ('', None)])
+
+    paper_ids = np.array(ids, dtype=np.int64)
+    order = np.argsort(paper_ids, kind='stable')
+    paper_ids = paper_ids[order]
+    n = len(paper_ids)
+
+    # C[i, j] = 1 if paper i cites paper j; references outside the corpus are dropped
+    rows = np.repeat(np.arange(n), [len(refs[k]) for k in order])
+    targets = np.fromiter((r for k in order for r in refs[k]), dtype=np.int64, count=len(rows))
+    cols = np.searchsorted(paper_ids, targets)
+    cols = np.minimum(cols, n - 1)
+    found = paper_ids[cols] == targets
+    citations = sp.csr_matrix((np.ones(found.sum(), dtype=np.float32), (rows[found], cols[found])), shape=(n, n))
+    citations.data[:] = 1.0  # duplicate references collapse to a single edge
+
+    fos_names, fos_codes = np.unique(np.array([fos[k] for k in order], dtype=object).astype(str), return_inverse=True)
+
+    author_lists = [authors[k] for k in order]
+    author_ids = np.unique(np.fromiter((a for lst in author_lists for a in lst), dtype=np.int64))
+    a_rows = np.searchsorted(author_ids, np.fromiter((a for lst in author_lists for a in lst), dtype=np.int64))
+    a_cols = np.repeat(np.arange(n), [len(lst) for lst in author_lists])
+    authorship = sp.csr_matrix((np.ones(len(a_rows), dtype=np.float32), (a_rows, a_cols)), shape=(len(author_ids), n))
+    authorship.data[:] = 1.0
+
+    logger.info(f"Loaded {n} papers, {citations.nnz} in-corpus citations, {len(author_ids)} authors, {len(fos_names)} fields")
+    return paper_ids, citations, fos_names, fos_codes.astype(np.int32), author_ids, authorship
+
+
+def pagerank(citations, damping=DEFAULT_DAMPING, tol=1e-9, max_iter=100):
+    # Power iteration on the citation graph; rank flows from citing to cited
+    # papers and the mass of papers without (in-corpus) references is spread uniformly.
+    n = citations.shape[0]
+    out_degree = np.asarray(citations.sum(axis=1)).ravel()
+    dangling = out_degree == 0
+    inv_out = np.divide(1.0, out_degree, out=np.zeros(n), where=~dangling)
+    transition_t = (sp.diags(inv_out) @ citations).T.tocsr()
+    rank = np.full(n, 1.0 / n)
+    for i in range(max_iter):
+        new_rank = damping * (transition_t @ rank) + (damping * rank[dangling].sum() + 1 - damping) / n
+        delta = np.abs(new_rank - rank).sum()
+        rank = new_rank
+        if delta < tol:
+            logger.info(f"PageRank converged after {i + 1} iterations")
+            break
+    return rank
+
+
+def in_field_pagerank(citations, fos_codes, damping=DEFAULT_DAMPING):
+    # PageRank restricted to citations between papers sharing the same primary field
+    coo = citations.tocoo()
+    same = fos_codes[coo.row] == fos_codes[coo.col]
+    in_field = sp.csr_matrix((coo.data[same], (coo.row[same], coo.col[same])), shape=citations.shape)
+    return pagerank(in_field, damping)
+
+
+def top_k_rows(matrix, k):
+    # Top-k columns per row of a sparse matrix by value, -1 padded
+    matrix = matrix.tocsr()
+    n = matrix.shape[0]
+    idx = np.full((n, k), -1, dtype=np.int32)
+    score = np.zeros((n, k), dtype=np.float32)
+    if matrix.nnz == 0:
+        return idx, score
+    row = np.repeat(np.arange(n), np.diff(matrix.indptr))
+    order = np.lexsort((matrix.indices, -matrix.data, row))
+    pos = np.arange(len(order)) - matrix.indptr[row[order]]
+    keep = pos < k
+    idx[row[order][keep], pos[keep]] = matrix.indices[order][keep]
+    score[row[order][keep], pos[keep]] = matrix.data[order][keep]
+    return idx, score
+
+
+def top_k_similar(left, right, k, desc):
+    # Top-k of left @ right (without the diagonal), computed in row blocks to bound memory
+    n = left.shape[0]
+    idx = np.full((n, k), -1, dtype=np.int32)
+    score = np.zeros((n, k), dtype=np.float32)
+    for start in tqdm(range(0, n, BLOCK_SIZE), desc=desc):
+        stop = min(start + BLOCK_SIZE, n)
+        block = (left[start:stop] @ right).tocoo()
+        off_diag = block.row + start != block.col
+        block = sp.csr_matrix((block.data[off_diag], (block.row[off_diag], block.col[off_diag])), shape=block.shape)
+        idx[start:stop], score[start:stop] = top_k_rows(block, k)
+    return idx, score
+
+
+def collaboration_degree(authorship):
+    # Number of distinct co-authors per author
+    degree = np.zeros(authorship.shape[0], dtype=np.int32)
+    for start in tqdm(range(0, authorship.shape[0], BLOCK_SIZE), desc="Author collaboration"):
+        block = authorship[start:start + BLOCK_SIZE] @ authorship.T
+        degree[start:start + BLOCK_SIZE] = np.diff(block.tocsr().indptr) - 1
+    return np.maximum(degree, 0)
+
+
+def compute_analytics(data_path=DATA_PATH, output_path=ANALYTICS_PATH, top_k=DEFAULT_TOP_K, damping=DEFAULT_DAMPING):
+    start_time = time.time()
+    paper_ids, citations, fos_names, fos_codes, author_ids, authorship = load_citation_graph(data_path)
+    citations_t = citations.T.tocsr()
+
+    pr = pagerank(citations, damping)
+    in_field_pr = in_field_pagerank(citations, fos_codes, damping)
+    # Co-citation: cited together by the same papers; coupling: sharing references
+    cocitation_idx, cocitation_score = top_k_similar(citations_t, citations, top_k, "Co-citation")
+    coupling_idx, coupling_score = top_k_similar(citations, citations_t, top_k, "Bibliographic coupling")
+
+    np.savez(
+        output_path,
+        paper_ids=paper_ids,
+        pagerank=pr.astype(np.float32),
+        in_field_pagerank=in_field_pr.astype(np.float32),
+        n_cited_in_corpus=np.diff(citations_t.indptr).astype(np.int32),
+        fos_names=fos_names,
+        fos_codes=fos_codes,
+        cocitation_idx=cocitation_idx,
+        cocitation_score=cocitation_score,
+        coupling_idx=coupling_idx,
+        coupling_score=coupling_score,
+        author_ids=author_ids,
+        author_degree=collaboration_degree(authorship),
+        author_n_papers=np.diff(authorship.indptr).astype(np.int32),
+    )
+    logger.info(f"Graph analytics written to {output_path} in {time.time() - start_time:.2f} seconds")
+
+
+# --- Serving: constant-time lookups over the precomputed arrays ---
+class GraphAnalytics:
+    def __init__(self, path=ANALYTICS_PATH):
+        data = np.load(path, allow_pickle=False)
+        self.paper_ids = data['paper_ids']
+        self.pagerank = data['pagerank']
+        self.in_field_pagerank = data['in_field_pagerank']
+        self.n_cited_in_corpus = data['n_cited_in_corpus']
+        self.fos_names = data['fos_names']
+        self.fos_codes = data['fos_codes']
+        self.related = {
+            'co_citation': (data['cocitation_idx'], data['cocitation_score']),
+            'bibliographic_coupling': (data['coupling_idx'], data['coupling_score']),
+        }
+        self.author_ids = data['author_ids']
+        self.author_degree = data['author_degree']
+        self.author_n_papers = data['author_n_papers']
+        self._fos_lookup = {name.strip().lower(): code for code, name in enumerate(self.fos_names)}
+
+        # Orders sorted by (field, -score) so a field's ranking is one contiguous slice
+        self.rankings = {}
+        for measure, scores in (('pagerank', self.pagerank), ('in_field', self.in_field_pagerank)):
+            overall = np.argsort(-scores, kind='stable')
+            by_field = np.lexsort((-scores, self.fos_codes))
+            field_offsets = np.searchsorted(self.fos_codes[by_field], np.arange(len(self.fos_names) + 1))
+            rank = np.empty(len(scores), dtype=np.int64)
+            rank[overall] = np.arange(len(scores))
+            self.rankings[measure] = (overall, by_field, field_offsets, rank)
+
+    def paper_index(self, paper_id):
+        i = int(np.searchsorted(self.paper_ids, paper_id))
+        return i if i < len(self.paper_ids) and self.paper_ids[i] == paper_id else None
+
+    def field_code(self, field):
+        return self._fos_lookup.get(field.strip().lower())
+
+    def top_papers(self, measure='pagerank', limit=10, field=None):
+        overall, by_field, field_offsets, _ = self.rankings[measure]
+        if field is None:
+            selected = overall[:limit]
+        else:
+            selected = by_field[field_offsets[field]:field_offsets[field + 1]][:limit]
+        scores = self.pagerank if measure == 'pagerank' else self.in_field_pagerank
+        return [(int(self.paper_ids[i]), float(scores[i])) for i in selected]
+
+    def influence(self, index):
+        rank = self.rankings['pagerank'][3][index]
+        return {
+            'pagerank': float(self.pagerank[index]),
+            'pagerank_rank': int(rank) + 1,
+            'pagerank_percentile': float(100.0 * (1 - rank / len(self.paper_ids))),
+            'in_field_pagerank': float(self.in_field_pagerank[index]),
+            'primary_field': str(self.fos_names[self.fos_codes[index]]),
+            'n_cited_in_corpus': int(self.n_cited_in_corpus[index]),
+        }
+
+    def related_papers(self, index, relation='co_citation', limit=10):
+        idx, score = self.related[relation]
+        return [(int(self.paper_ids[j]), float(s)) for j, s in zip(idx[index][:limit], score[index][:limit]) if j >= 0]
+
+    def author_collaboration(self, author_id):
+        i = int(np.searchsorted(self.author_ids, author_id))
+        if i >= len(self.author_ids) or self.author_ids[i] != author_id:
+            return None
+        return {'author_id': int(author_id), 'n_coauthors': int(self.author_degree[i]), 'n_papers': int(self.author_n_papers[i])}
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    compute_analytics()
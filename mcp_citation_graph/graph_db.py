@@ -2,12 +2,12 @@ import json
 import os
 import time
 import concurrent.futures
-from neo4j import GraphDatabase
+from neo4j import GraphDatabase, unit_of_work
+from neo4j.exceptions import Neo4jError
 from tqdm import tqdm
 import logging
 
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 NEO4J_URI = "bolt://127.0.0.1:7687"
@@ -15,14 +15,39 @@ NEO4J_USER = "neo4j"
 NEO4J_PASSWORD = "neo4j"
 DEFAULT_WORKERS = 4
 DEFAULT_BATCH_SIZE = 100
+DEFAULT_POOL_SIZE = 50
+DEFAULT_FANOUT = 100
+TREE_ORDER_FIELDS = {"n_citation", "year"}
+
+# Properties returned for every paper `c` of a citation tree; see _tree_paper for the
+# final shape, which matches the Marqo documents
+PAPER_PROJECTION = """{
+                           .id, .title, .year, .n_citation, .doc_type,
+                           authors: [(a:Author)-[w:WROTE]->(c) | {pos: w.position, name: a.name, org: a.organization}],
+                           venue_name: head([(c)-[:PUBLISHED_IN]->(v:Venue) | v.name]),
+                           references: [(c)-[:CITES]->(r:Paper) | r.id]
+                       }"""
+
+
+def _tree_paper(paper):
+    # Names and orgs come from one list of authorships, sorted by WROTE.position,
+    # so they stay paired and in author order
+    paper = dict(paper)
+    authors = sorted(paper.pop("authors") or [], key=lambda a: a["pos"] if a["pos"] is not None else -1)
+    paper["author_names"] = [a["name"] for a in authors]
+    paper["author_orgs"] = [a["org"] for a in authors]
+    return paper
+
 
 class Neo4jCitationNetwork:
-    def __init__(self, uri=NEO4J_URI, user=NEO4J_USER, password=NEO4J_PASSWORD, database='papers'):
+    def __init__(self, uri=NEO4J_URI, user=NEO4J_USER, password=NEO4J_PASSWORD, database='papers',
+                 max_connection_pool_size=DEFAULT_POOL_SIZE):
         self.uri = uri
         self.user = user
         self.password = password
         self.database = database
-        self.driver = GraphDatabase.driver(uri, auth=(user, password), database=database)
+        self.driver = GraphDatabase.driver(uri, auth=(user, password), database=database,
+                                           max_connection_pool_size=max_connection_pool_size)
         
     def close(self):
         self.driver.close()
@@ -244,6 +269,75 @@ class Neo4jCitationNetwork:
                 except Exception as e:
                     logger.error(f"Error processing paper {paper.get('id', 'unknown')}: {e}")
 
+    def _hop_query(self, direction, order_by):
+        # Neighbours of all frontier papers for one hop; the correlated CALL
+        # subquery counts each parent's neighbours and keeps the best $fanout
+        # (per-hop fan-out), which are the only ones projected.
+        if order_by not in TREE_ORDER_FIELDS:
+            raise ValueError(f"order_by must be one of {sorted(TREE_ORDER_FIELDS)}")
+        pattern = "(p)<-[:CITES]-(c:Paper)" if direction == "cited_by" else "(p)-[:CITES]->(c:Paper)"
+        return f"""
+        UNWIND $parents AS parent_id
+        MATCH (p:Paper {{id: parent_id}})
+        CALL {{
+            WITH p
+            MATCH {pattern}
+            WHERE c.title IS NOT NULL
+            WITH c ORDER BY coalesce(c.{order_by}, -1) DESC, c.id
+            WITH collect(c) AS ranked
+            RETURN size(ranked) AS total, ranked[..$fanout] AS kept
+        }}
+        UNWIND kept AS c
+        RETURN p.id AS parent, total, c {PAPER_PROJECTION} AS paper
+        """
+
+    def get_citation_trees(self, paper_id, successor_depth=0, predecessor_depth=0, fanout=DEFAULT_FANOUT,
+                           order_by="n_citation", timeout=None, max_nodes=None):
+        # Returns {"cited_by": hops, "cites": hops, "timed_out": bool}, where
+        # hops[h] maps a parent paper id to (number of neighbours, its at most
+        # fanout best neighbours) at hop h + 1. Each hop is one query, and only
+        # the papers a breadth-first walk keeps within max_nodes are expanded
+        # further. With a timeout (seconds) every query gets what is left of it,
+        # and the hops finished before it runs out are returned with "timed_out" set.
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        trees = {"cited_by": [], "cites": [], "timed_out": False}
+        room = max_nodes
+        with self.driver.session() as session:
+            # References first, they are bounded per paper while citations are not
+            for direction, depth in (("cites", predecessor_depth), ("cited_by", successor_depth)):
+                query = self._hop_query(direction, order_by)
+                frontier = [paper_id]
+                for _ in range(depth):
+                    if not frontier or (room is not None and room <= 0):
+                        break
+
+                    def read_hop(tx, parents=list(dict.fromkeys(frontier))):
+                        return list(tx.run(query, parents=parents, fanout=fanout))
+
+                    if deadline is not None:
+                        remaining = deadline - time.perf_counter()
+                        if remaining <= 0:
+                            trees["timed_out"] = True
+                            return trees
+                        read_hop = unit_of_work(timeout=remaining)(read_hop)
+                    try:
+                        records = session.execute_read(read_hop)
+                    except Neo4jError as e:
+                        if 'TransactionTimedOut' not in (e.code or ''):
+                            raise
+                        trees["timed_out"] = True
+                        return trees
+                    hop = {}
+                    for record in records:
+                        hop.setdefault(record["parent"], (record["total"], []))[1].append(_tree_paper(record["paper"]))
+                    trees[direction].append(hop)
+                    # The papers build_tree will keep, in the order it adds them
+                    frontier = [paper["id"] for parent in frontier for paper in hop.get(parent, (0, []))[1]]
+                    if room is not None:
+                        frontier = frontier[:room]
+                        room -= len(frontier)
+        return trees
+
     def create_graph(self, file_path=None, num_workers=DEFAULT_WORKERS, batch_size=DEFAULT_BATCH_SIZE):
         if file_path is None:
             file_path = os.path.join("data", "dblp.filtered.json")
@@ -274,5 +368,6 @@ class Neo4jCitationNetwork:
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
     client = Neo4jCitationNetwork()
     client.create_graph()#file_path='data/dblp.filtered.y2000_r9_c5.json')
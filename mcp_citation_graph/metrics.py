@@ -0,0 +1,256 @@
+import time
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+
+# --- Prometheus-style in-process metrics ---
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DEFAULT_SIZE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000, 25_000, 100_000, 1_000_000)
+
+
+def _format_labels(label_names, label_values, extra=None):
+    pairs = list(zip(label_names, label_values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = [(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for k, v in pairs]
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1.0):
+        key = tuple(str(v) for v in label_values)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, *label_values) -> float:
+        return self._values.get(tuple(str(v) for v in label_values), 0.0)
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = (), buckets=DEFAULT_LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        key = tuple(str(v) for v in label_values)
+        with self._lock:
+            # Per-bucket (non-cumulative) counts followed by sum and count
+            state = self._values.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        for key, state in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                le = ("le", _format_value(bound) if bound == float("inf") else repr(float(bound)))
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {int(cumulative)}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {int(state[-1])}")
+        return lines
+
+
+class HitRatio:
+    # Gauge derived at exposition time from a counter labelled (..., result)
+    # with hit/miss results, one ratio per remaining label set.
+    def __init__(self, name: str, documentation: str, counter: Counter):
+        self.name = name
+        self.documentation = documentation
+        self.counter = counter
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        with self.counter._lock:
+            items = list(self.counter._values.items())
+        totals: Dict[Tuple[str, ...], List[float]] = {}
+        for key, value in items:
+            hits_total = totals.setdefault(key[:-1], [0.0, 0.0])
+            hits_total[0] += value if key[-1] == "hit" else 0.0
+            hits_total[1] += value
+        for key, (hits, total) in sorted(totals.items()):
+            lines.append(f"{self.name}{_format_labels(self.counter.label_names[:-1], key)} {_format_value(hits / total)}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name, documentation, label_names=()):
+        metric = Counter(name, documentation, label_names)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, label_names=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        metric = Histogram(name, documentation, label_names, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def hit_ratio(self, name, documentation, counter):
+        metric = HitRatio(name, documentation, counter)
+        self._metrics.append(metric)
+        return metric
+
+    def expose(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.expose())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+REQUEST_LATENCY = REGISTRY.histogram(
+    "backend_request_latency_seconds", "Latency of API requests per operation_id.", ("operation_id", "status")
+)
+UPSTREAM_CALLS = REGISTRY.counter(
+    "backend_upstream_calls_total", "Calls made to upstream services per call type.", ("service", "call_type", "outcome")
+)
+UPSTREAM_LATENCY = REGISTRY.histogram(
+    "backend_upstream_call_latency_seconds", "Latency of upstream calls per call type.", ("service", "call_type")
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    "backend_cache_requests_total", "Cache lookups per cache and result (hit or miss).", ("cache", "result")
+)
+CACHE_HIT_RATIO = REGISTRY.hit_ratio(
+    "backend_cache_hit_ratio", "Share of cache lookups that were hits since startup, per cache.", CACHE_REQUESTS
+)
+TRAVERSAL_NODES = REGISTRY.histogram(
+    "backend_traversal_result_nodes", "Number of paper nodes returned by graph traversals.", ("operation_id",),
+    buckets=DEFAULT_SIZE_BUCKETS
+)
+TRAVERSAL_TRUNCATIONS = REGISTRY.counter(
+    "backend_traversal_truncations_total", "Graph traversals cut short by their budget, per reason.", ("operation_id", "reason")
+)
+
+
+# --- Per-request upstream call tracing ---
+_current_trace: ContextVar[Optional[List[dict]]] = ContextVar("upstream_trace", default=None)
+
+
+def start_trace():
+    # The list is shared by reference with the threadpool copy of the context,
+    # so sync endpoints can append to it.
+    trace = []
+    token = _current_trace.set(trace)
+    return trace, token
+
+
+def end_trace(token):
+    _current_trace.reset(token)
+
+
+def summarize_trace(trace: List[dict]) -> dict:
+    summary = {}
+    for call in trace:
+        key = f"{call['service']}.{call['call_type']}"
+        entry = summary.setdefault(key, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+        entry["count"] += 1
+        entry["total_ms"] += call["ms"]
+        entry["max_ms"] = max(entry["max_ms"], call["ms"])
+    for entry in summary.values():
+        entry["total_ms"] = round(entry["total_ms"], 3)
+        entry["max_ms"] = round(entry["max_ms"], 3)
+    return {"n_calls": len(trace), "calls": summary}
+
+
+@contextmanager
+def track_upstream(service: str, call_type: str):
+    outcome = "ok"
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        UPSTREAM_CALLS.inc(service, call_type, outcome)
+        UPSTREAM_LATENCY.observe(elapsed, service, call_type)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.append({"service": service, "call_type": call_type, "ms": elapsed * 1000, "outcome": outcome})
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.inc(cache, "hit" if hit else "miss")
+
+
+# --- Startup profiling ---
+class StartupProfiler:
+    # Wall-clock cost of each startup phase, from the first import of this
+    # module to the end of the application lifespan startup.
+    def __init__(self):
+        self.start = time.perf_counter()
+        self._last = self.start
+        self.phases: Dict[str, float] = {}
+        self.ready = False
+        self._lock = threading.Lock()
+
+    def mark(self, name: str):
+        # Records the time since the previous mark or phase as `name`
+        with self._lock:
+            now = time.perf_counter()
+            self.phases[name] = self.phases.get(name, 0.0) + now - self._last
+            self._last = now
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                now = time.perf_counter()
+                self.phases[name] = self.phases.get(name, 0.0) + now - start
+                self._last = now
+
+    def finish(self):
+        self.ready = True
+        self.total = time.perf_counter() - self.start
+
+    def report(self) -> dict:
+        with self._lock:
+            phases = {name: round(seconds * 1000, 3) for name, seconds in self.phases.items()}
+        total = self.total if self.ready else time.perf_counter() - self.start
+        return {"ready": self.ready, "total_ms": round(total * 1000, 3), "phases_ms": phases}
+
+
+STARTUP = StartupProfiler()
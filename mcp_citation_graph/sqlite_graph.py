@@ -0,0 +1,308 @@
+import os
+import time
+import sqlite3
+import threading
+import ijson
+from tqdm import tqdm
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+SQLITE_PATH = 'data/citation_graph.sqlite'
+DEFAULT_WORKERS = 1
+DEFAULT_BATCH_SIZE = 10_000
+DEFAULT_FANOUT = 100
+TREE_ORDER_FIELDS = {"n_citation", "year"}
+MAX_QUERY_PARAMS = 500
+
+# Nodes are tables keyed by id, relationships are edge tables whose primary key
+# serves lookups from one end and a secondary index lookups from the other.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    id INTEGER PRIMARY KEY, title TEXT, year INTEGER, n_citation INTEGER,
+    doc_type TEXT, publisher TEXT, n_reference INTEGER
+);
+CREATE TABLE IF NOT EXISTS authors (id INTEGER PRIMARY KEY, name TEXT, organization TEXT);
+CREATE TABLE IF NOT EXISTS venues (id INTEGER PRIMARY KEY, name TEXT, type TEXT);
+CREATE TABLE IF NOT EXISTS fields (id INTEGER PRIMARY KEY, name TEXT UNIQUE);
+CREATE TABLE IF NOT EXISTS cites (src INTEGER, dst INTEGER, PRIMARY KEY (src, dst)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS wrote (
+    paper_id INTEGER, author_id INTEGER, position INTEGER, PRIMARY KEY (paper_id, author_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS published_in (paper_id INTEGER PRIMARY KEY, venue_id INTEGER);
+CREATE TABLE IF NOT EXISTS in_field (
+    paper_id INTEGER, field_id INTEGER, weight REAL, PRIMARY KEY (paper_id, field_id)
+) WITHOUT ROWID;
+"""
+
+# Built after the bulk load, which is faster than maintaining them row by row
+INDEXES = """
+CREATE INDEX IF NOT EXISTS cites_dst ON cites (dst, src);
+CREATE INDEX IF NOT EXISTS wrote_author ON wrote (author_id);
+CREATE INDEX IF NOT EXISTS published_in_venue ON published_in (venue_id);
+CREATE INDEX IF NOT EXISTS in_field_field ON in_field (field_id);
+CREATE INDEX IF NOT EXISTS paper_title ON papers (title);
+CREATE INDEX IF NOT EXISTS paper_year ON papers (year);
+CREATE INDEX IF NOT EXISTS author_name ON authors (name);
+CREATE INDEX IF NOT EXISTS venue_name ON venues (name);
+"""
+
+
+def _chunks(values, size=MAX_QUERY_PARAMS):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _int_or_none(value):
+    return int(value) if value not in ('', None) else None
+
+
+class SQLiteCitationNetwork:
+    # Embedded, single-file alternative to Neo4jCitationNetwork with the same
+    # ingest interface and get_citation_trees output, for deployments without a
+    # graph database server.
+    def __init__(self, path=SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        # One connection per thread; sqlite3 connections must not be shared
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+    def create_schema(self):
+        conn = self._connection()
+        conn.executescript(SCHEMA)
+        logger.info("Schema created successfully")
+
+    def create_indexes(self):
+        conn = self._connection()
+        conn.executescript(INDEXES)
+        conn.execute("ANALYZE")
+        logger.info("Indexes created successfully")
+
+    def _field_ids(self):
+        return {name: fid for fid, name in self._connection().execute("SELECT id, name FROM fields")}
+
+    def _batch_rows(self, papers_batch, field_ids):
+        rows = {key: [] for key in ('papers', 'authors', 'wrote', 'venues', 'published_in', 'cites', 'fields', 'in_field')}
+        for paper in papers_batch:
+            pid = int(paper["id"])
+            rows['papers'].append((pid, paper.get("title"), _int_or_none(paper.get("year")), paper.get("n_citation", 0),
+                                   paper.get("doc_type", ""), paper.get("publisher", ""), paper.get("n_reference", 0)))
+
+            names, orgs = paper.get("author_names") or [], paper.get("author_orgs") or []
+            for i, (name, auth_id) in enumerate(zip(names, paper.get("author_ids") or [])):
+                auth_id = _int_or_none(auth_id)
+                if auth_id is None:
+                    continue
+                rows['authors'].append((auth_id, name, orgs[i] if i < len(orgs) else ""))
+                rows['wrote'].append((pid, auth_id, i))
+
+            venue_id = _int_or_none(paper.get("venue_id"))
+            if venue_id is not None and "venue_name" in paper:
+                rows['venues'].append((venue_id, paper["venue_name"], paper.get("venue_type", "")))
+                rows['published_in'].append((pid, venue_id))
+
+            rows['cites'].extend((pid, int(ref_id)) for ref_id in paper.get("references") or [])
+
+            weights = paper.get("fos_ws") or []
+            for i, fos_name in enumerate(paper.get("fos_names") or []):
+                if fos_name not in field_ids:
+                    field_ids[fos_name] = len(field_ids) + 1
+                    rows['fields'].append((field_ids[fos_name], fos_name))
+                weight = weights[i] if i < len(weights) and weights[i] is not None else 0.0
+                rows['in_field'].append((pid, field_ids[fos_name], float(weight)))
+        return rows
+
+    def _process_batch(self, papers_batch, field_ids):
+        # One transaction per batch; OR IGNORE keeps the first version of a node
+        # or edge, like MERGE ... ON CREATE SET in the Neo4j loader.
+        rows = self._batch_rows(papers_batch, field_ids)
+        conn = self._connection()
+        with conn:
+            conn.executemany("INSERT OR IGNORE INTO papers VALUES (?, ?, ?, ?, ?, ?, ?)", rows['papers'])
+            conn.executemany("INSERT OR IGNORE INTO authors VALUES (?, ?, ?)", rows['authors'])
+            conn.executemany("INSERT OR IGNORE INTO wrote VALUES (?, ?, ?)", rows['wrote'])
+            conn.executemany("INSERT OR IGNORE INTO venues VALUES (?, ?, ?)", rows['venues'])
+            conn.executemany("INSERT OR IGNORE INTO published_in VALUES (?, ?)", rows['published_in'])
+            conn.executemany("INSERT OR IGNORE INTO cites VALUES (?, ?)", rows['cites'])
+            conn.executemany("INSERT OR IGNORE INTO fields VALUES (?, ?)", rows['fields'])
+            conn.executemany("INSERT OR IGNORE INTO in_field VALUES (?, ?, ?)", rows['in_field'])
+        return len(papers_batch)
+
+    def process_data_file(self, file_path, num_workers=DEFAULT_WORKERS, batch_size=DEFAULT_BATCH_SIZE):
+        # SQLite has a single writer, so papers are streamed and written by one
+        # thread; num_workers is accepted for interface compatibility.
+        logger.info(f"Processing file: {file_path}")
+        conn = self._connection()
+        conn.execute("PRAGMA synchronous=OFF")
+        field_ids = self._field_ids()
+        total_papers = 0
+        start_time = time.time()
+        with open(file_path, 'rb') as f, tqdm(desc="Loading papers") as progress:
+            batch = []
+            for paper in ijson.items(f, 'item', use_float=True):
+                batch.append(paper)
+                if len(batch) >= batch_size:
+                    total_papers += self._process_batch(batch, field_ids)
+                    progress.update(len(batch))
+                    batch = []
+            if batch:
+                total_papers += self._process_batch(batch, field_ids)
+                progress.update(len(batch))
+        conn.execute("PRAGMA synchronous=NORMAL")
+
+        processing_time = time.time() - start_time
+        papers_per_second = total_papers / processing_time if processing_time > 0 else 0
+        logger.info(f"Processing completed in {processing_time:.2f} seconds")
+        logger.info(f"Processed {total_papers} papers at {papers_per_second:.2f} papers/second")
+        return total_papers
+
+    def create_graph(self, file_path=None, num_workers=DEFAULT_WORKERS, batch_size=DEFAULT_BATCH_SIZE):
+        if file_path is None:
+            file_path = os.path.join("data", "dblp.filtered.json")
+
+        try:
+            start_time = time.time()
+            logger.info(f"Opened SQLite graph at {self.path}")
+            self.create_schema()
+            self.process_data_file(file_path, num_workers=num_workers, batch_size=batch_size)
+            self.create_indexes()
+            total_time = time.time() - start_time
+            logger.info(f"Data processing completed in {total_time:.2f} seconds")
+            self.close()
+
+            return total_time
+        except Exception as e:
+            logger.error(f"Error creating graph: {e}")
+            raise
+
+    def get_papers(self, paper_ids):
+        # {id: paper} for the papers with a title, shaped like the Marqo documents
+        conn = self._connection()
+        papers = {}
+        for chunk in _chunks(set(paper_ids)):
+            marks = ",".join("?" * len(chunk))
+            for pid, title, year, n_citation, doc_type, venue_name in conn.execute(f"""
+                    SELECT p.id, p.title, p.year, p.n_citation, p.doc_type, v.name FROM papers p
+                    LEFT JOIN published_in pi ON pi.paper_id = p.id LEFT JOIN venues v ON v.id = pi.venue_id
+                    WHERE p.id IN ({marks}) AND p.title IS NOT NULL""", chunk):
+                papers[pid] = {'id': pid, 'title': title, 'year': year, 'n_citation': n_citation, 'doc_type': doc_type,
+                               'author_names': [], 'author_orgs': [], 'venue_name': venue_name, 'references': []}
+            for pid, name, org in conn.execute(f"""
+                    SELECT w.paper_id, a.name, a.organization FROM wrote w JOIN authors a ON a.id = w.author_id
+                    WHERE w.paper_id IN ({marks}) ORDER BY w.paper_id, w.position""", chunk):
+                if pid in papers:
+                    papers[pid]['author_names'].append(name)
+                    papers[pid]['author_orgs'].append(org)
+            for src, dst in conn.execute(f"SELECT src, dst FROM cites WHERE src IN ({marks})", chunk):
+                if src in papers:
+                    papers[src]['references'].append(dst)
+        return papers
+
+    def ranked_neighbours(self, paper_ids, direction, fanout=None, order_by="n_citation"):
+        # {parent id: (number of neighbours, [neighbour ids])}, at most fanout ids
+        # per parent, best first by order_by
+        if order_by not in TREE_ORDER_FIELDS:
+            raise ValueError(f"order_by must be one of {sorted(TREE_ORDER_FIELDS)}")
+        parent, child = ("dst", "src") if direction == "cited_by" else ("src", "dst")
+        conn = self._connection()
+        result = {}
+        for chunk in _chunks(set(paper_ids)):
+            rows = conn.execute(f"""
+                SELECT parent, child, total FROM (
+                    SELECT c.{parent} AS parent, c.{child} AS child,
+                           ROW_NUMBER() OVER (PARTITION BY c.{parent} ORDER BY coalesce(p.{order_by}, -1) DESC, p.id) AS rank,
+                           COUNT(*) OVER (PARTITION BY c.{parent}) AS total
+                    FROM cites c JOIN papers p ON p.id = c.{child}
+                    WHERE c.{parent} IN ({",".join("?" * len(chunk))}) AND p.title IS NOT NULL
+                ) WHERE ? IS NULL OR rank <= ? ORDER BY parent, rank""", chunk + [fanout, fanout])
+            for p, c, total in rows:
+                result.setdefault(p, (total, []))[1].append(c)
+        return result
+
+    def neighbours(self, paper_ids, direction, fanout=None, order_by="n_citation"):
+        # {parent id: [neighbour ids]}, at most fanout per parent, best first by order_by
+        return {p: ids for p, (_, ids) in self.ranked_neighbours(paper_ids, direction, fanout, order_by).items()}
+
+    def k_hop_neighbourhood(self, paper_id, k, direction="both", fanout=None, order_by="n_citation"):
+        # Papers first reached at each of k hops (direction: cited_by, cites or
+        # both), as a list of id lists; a paper is only listed at its closest hop.
+        directions = ("cited_by", "cites") if direction == "both" else (direction,)
+        seen = {paper_id}
+        frontier = [paper_id]
+        hops = []
+        for _ in range(k):
+            reached = []
+            for d in directions:
+                for children in self.neighbours(frontier, d, fanout, order_by).values():
+                    for c in children:
+                        if c not in seen:
+                            seen.add(c)
+                            reached.append(c)
+            if not reached:
+                break
+            hops.append(reached)
+            frontier = reached
+        return hops
+
+    def get_citation_trees(self, paper_id, successor_depth=0, predecessor_depth=0, fanout=DEFAULT_FANOUT,
+                           order_by="n_citation", timeout=None, max_nodes=None):
+        # Same output as Neo4jCitationNetwork.get_citation_trees: hops[h] maps a
+        # parent paper id to (number of neighbours, its at most fanout best
+        # neighbours) at hop h + 1. Only the papers a breadth-first walk keeps
+        # within max_nodes are expanded further. With a timeout (seconds) the
+        # running statement is interrupted and the hops finished so far are
+        # returned with "timed_out" set.
+        conn = self._connection()
+        if timeout is not None:
+            deadline = time.perf_counter() + timeout
+            conn.set_progress_handler(lambda: time.perf_counter() > deadline, 10_000)
+        trees = {"cited_by": [], "cites": [], "timed_out": False}
+        room = max_nodes
+        try:
+            # References first, they are bounded per paper while citations are not
+            for direction, depth in (("cites", predecessor_depth), ("cited_by", successor_depth)):
+                frontier = [paper_id]
+                for _ in range(depth):
+                    if not frontier or (room is not None and room <= 0):
+                        break
+                    edges = self.ranked_neighbours(frontier, direction, fanout, order_by)
+                    papers = self.get_papers({c for _, children in edges.values() for c in children})
+                    hop = {p: (total, [papers[c] for c in children if c in papers]) for p, (total, children) in edges.items()}
+                    trees[direction].append(hop)
+                    # The papers build_tree will keep, in the order it adds them
+                    frontier = [c["id"] for p in frontier for c in hop.get(p, (0, []))[1]]
+                    if room is not None:
+                        frontier = frontier[:room]
+                        room -= len(frontier)
+        except sqlite3.OperationalError as e:
+            if timeout is None or 'interrupted' not in str(e):
+                raise
+            trees["timed_out"] = True
+        finally:
+            conn.set_progress_handler(None, 0)
+        return trees
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    client = SQLiteCitationNetwork()
+    client.create_graph()
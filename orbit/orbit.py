@@ -1,30 +1,78 @@
 import math
-import time
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.animation import FuncAnimation, FFMpegWriter, PillowWriter
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
 
+# All vertices and the polygon edges plus chords for (n_vertex, n_neighbor, gap)
+# are built as arrays and drawn with one LineCollection. Animating over gaps
+# only swaps the segments of that collection, so each frame costs the same
+# regardless of how many frames came before, and thousands of vertices still
+# render at a stable frame rate.
 
-def _draw(n_vertex=12, n_neighbor=3, gap=0, color='b'):
-    vertices = [[np.cos(i * 2 * math.pi / n_vertex), np.sin(i * 2 * math.pi / n_vertex)] for i in range(n_vertex)]
-    plt.plot([vertices[i][0] for i in range(n_vertex)], [vertices[i][1] for i in range(n_vertex)], f'{color}o')
 
-    edges = [[i, (i + 1) % n_vertex] for i in range(n_vertex)]
-    for edge in edges:
-        plt.plot([vertices[edge[0]][0], vertices[edge[1]][0]], [vertices[edge[0]][1], vertices[edge[1]][1]], f'{color}-')
+def star_polygon(n_vertex=12, n_neighbor=3, gap=0):
+    # Returns (vertices, segments): (n_vertex, 2) and (n_segments, 2, 2).
+    angles = np.arange(n_vertex) * 2 * math.pi / n_vertex
+    vertices = np.column_stack([np.cos(angles), np.sin(angles)])
+    steps = np.array([1] + list(range(2 + gap, n_neighbor + gap + 2)), dtype=np.int64)
+    start = np.repeat(np.arange(n_vertex), len(steps))
+    end = (start + np.tile(steps, n_vertex)) % n_vertex
+    return vertices, np.stack([vertices[start], vertices[end]], axis=1)
 
-    for i in range(n_vertex):
-        for j in range(2 + gap, n_neighbor + gap + 2):
-            plt.plot([vertices[i][0], vertices[(i + j) % n_vertex][0]], [vertices[i][1], vertices[(i + j) % n_vertex][1]], f'{color}-')
 
-    plt.axis('equal')
+def _setup_axes(ax):
+    ax.set_xlim(-1.1, 1.1)
+    ax.set_ylim(-1.1, 1.1)
+    ax.set_aspect('equal')
 
 
-def draw(n_vertex=12, n_neighbor=3):
-    for gap in range(3):
-        _draw(n_vertex, n_neighbor, gap, 'b')
-        time.sleep(0.2)
-        _draw(n_vertex, n_neighbor, gap, 'w')
+def draw(n_vertex=12, n_neighbor=3, gap=0, color='b', ax=None):
+    ax = plt.gca() if ax is None else ax
+    vertices, segments = star_polygon(n_vertex, n_neighbor, gap)
+    lines = ax.add_collection(LineCollection(segments, colors=color, linewidths=1))
+    points, = ax.plot(vertices[:, 0], vertices[:, 1], 'o', color=color)
+    _setup_axes(ax)
+    return lines, points
 
 
-plt.figure(figsize=(10, 10))
-draw(12, 2)
+def animate(n_vertex=12, n_neighbor=3, gaps=range(3), fps=5, color='b', fig=None, repeat=True):
+    # One frame per gap; keep a reference to the returned animation while it plays.
+    fig = plt.figure(figsize=(10, 10)) if fig is None else fig
+    ax = fig.gca() if fig.axes else fig.add_subplot()
+    gaps = list(gaps)
+    frames = [star_polygon(n_vertex, n_neighbor, gap)[1] for gap in gaps]
+    lines, points = draw(n_vertex, n_neighbor, gaps[0], color, ax)
+
+    def update(i):
+        lines.set_segments(frames[i])
+        return lines, points
+
+    return FuncAnimation(fig, update, frames=len(frames), interval=1000 / fps, blit=True, repeat=repeat)
+
+
+def save_animation(path, n_vertex=12, n_neighbor=3, gaps=range(3), fps=5, color='b', size=(10, 10), dpi=100):
+    # Renders off-screen on an Agg canvas, so it also works without a display.
+    fig = Figure(figsize=size)
+    FigureCanvasAgg(fig)
+    anim = animate(n_vertex, n_neighbor, gaps, fps, color, fig=fig, repeat=False)
+    if str(path).lower().endswith('.gif'):
+        writer = PillowWriter(fps=fps)
+    else:
+        writer = FFMpegWriter(fps=fps)
+    anim.save(path, writer=writer, dpi=dpi)
+    return path
+
+
+def render_orbit(path, n_vertex=12, n_neighbor=3, gap=0, resolution=1024, color=(0, 0, 255)):
+    from fractal_render.raster import render_segments
+    _, segments = star_polygon(n_vertex, n_neighbor, gap)
+    return render_segments(segments, path, bounds=((-1.05, 1.05), (-1.05, 1.05)), resolution=resolution,
+                           tone='coverage', color=color)
+
+
+if __name__ == "__main__":
+    anim = animate(12, 2)
+    plt.show()
@@ -0,0 +1,145 @@
+import math
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from fractal_render.raster import Canvas
+
+# Vectorized chaos game for arbitrary iterated function systems (IFS).
+# Instead of following one point for N iterations, a few thousand independent
+# walkers are advanced together, so each iteration is a handful of NumPy ops
+# that emits one chunk of points. Chunks are binned straight into a fixed-size
+# density grid (fractal_render.raster.Canvas), so memory depends on the grid resolution, not on the number
+# of points. Independent streams (each with its own walkers and a seed spawned
+# from one SeedSequence) run in separate processes and their grids are summed.
+
+DEFAULT_WALKERS = 1 << 16
+DEFAULT_STREAMS = 16
+BURN_IN = 32
+
+
+class IFS:
+    # Affine maps x -> A[k] @ x + b[k], chosen with probabilities p[k].
+    # forbidden_offsets implements vertex-restriction rules for n-gon chaos
+    # games: an offset o forbids choosing map (prev + o) % n right after map prev.
+    def __init__(self, A, b, probabilities=None, forbidden_offsets=(), vertices=None):
+        self.A = np.asarray(A, dtype=np.float64).reshape(-1, 2, 2)
+        self.b = np.asarray(b, dtype=np.float64).reshape(-1, 2)
+        n_maps = len(self.A)
+        if len(self.b) != n_maps:
+            raise ValueError("A and b must describe the same number of maps")
+        if probabilities is None:
+            probabilities = np.full(n_maps, 1.0 / n_maps)
+        self.probabilities = np.asarray(probabilities, dtype=np.float64)
+        if self.probabilities.shape != (n_maps,) or np.any(self.probabilities < 0):
+            raise ValueError("probabilities must be one non-negative weight per map")
+        self.probabilities = self.probabilities / self.probabilities.sum()
+        self.forbidden_offsets = tuple(sorted({int(o) % n_maps for o in forbidden_offsets}))
+        if self.forbidden_offsets and not np.allclose(self.probabilities, 1.0 / n_maps):
+            raise ValueError("vertex restrictions are only supported with uniform map probabilities")
+        self.allowed_offsets = np.array([o for o in range(n_maps) if o not in self.forbidden_offsets], dtype=np.int64)
+        if len(self.allowed_offsets) == 0:
+            raise ValueError("vertex restrictions forbid every map")
+        self.vertices = None if vertices is None else np.asarray(vertices, dtype=np.float64)
+
+    @property
+    def n_maps(self):
+        return len(self.A)
+
+
+def regular_polygon(n_vertex, radius=1.0, rotation=math.pi / 2):
+    angles = rotation + 2 * math.pi * np.arange(n_vertex) / n_vertex
+    return radius * np.stack([np.cos(angles), np.sin(angles)], axis=1)
+
+
+def optimal_jump_ratio(n_vertex):
+    # Jump ratio at which the n scaled copies of the polygon just touch
+    # (0.5 for the triangle, ~0.618 for the pentagon).
+    scale = 1 / (2 * (1 + sum(math.cos(2 * math.pi * k / n_vertex) for k in range(1, n_vertex // 4 + 1))))
+    return 1 - scale
+
+
+def ngon(n_vertex, jump_ratio=None, forbidden_offsets=(), vertices=None):
+    # Move jump_ratio of the way towards a randomly chosen vertex:
+    # x -> (1 - r) x + r v
+    if vertices is None:
+        vertices = regular_polygon(n_vertex)
+    vertices = np.asarray(vertices, dtype=np.float64)
+    r = optimal_jump_ratio(len(vertices)) if jump_ratio is None else jump_ratio
+    A = np.repeat(((1 - r) * np.eye(2))[None], len(vertices), axis=0)
+    b = r * vertices
+    return IFS(A, b, forbidden_offsets=forbidden_offsets, vertices=vertices)
+
+
+def sierpinski_triangle():
+    return ngon(3, 0.5, vertices=np.array([[0, 0], [1, 0], [0.5, np.sqrt(3) / 2]]))
+
+
+def barnsley_fern():
+    A = [[[0.0, 0.0], [0.0, 0.16]],
+         [[0.85, 0.04], [-0.04, 0.85]],
+         [[0.2, -0.26], [0.23, 0.22]],
+         [[-0.15, 0.28], [0.26, 0.24]]]
+    b = [[0.0, 0.0], [0.0, 1.6], [0.0, 1.6], [0.0, 0.44]]
+    return IFS(A, b, probabilities=[0.01, 0.85, 0.07, 0.07])
+
+
+def iterate_chunks(ifs, n_points, rng, n_walkers=DEFAULT_WALKERS):
+    # Yields (m, 2) arrays of points until n_points have been produced.
+    n_walkers = max(1, min(n_walkers, n_points))
+    points = rng.random((n_walkers, 2))
+    prev = rng.integers(0, ifs.n_maps, size=n_walkers)
+    cumulative = np.cumsum(ifs.probabilities)
+    cumulative[-1] = 1.0
+    produced = -BURN_IN * n_walkers
+    while produced < n_points:
+        if ifs.forbidden_offsets:
+            offsets = ifs.allowed_offsets[rng.integers(0, len(ifs.allowed_offsets), size=n_walkers)]
+            choice = (prev + offsets) % ifs.n_maps
+        else:
+            choice = np.searchsorted(cumulative, rng.random(n_walkers), side='right')
+        points = np.einsum('nij,nj->ni', ifs.A[choice], points) + ifs.b[choice]
+        prev = choice
+        produced += n_walkers
+        if produced > 0:
+            yield points[:n_walkers - max(0, produced - n_points)]
+
+
+def estimate_bounds(ifs, n_points=200_000, seed=0, padding=0.02):
+    chunks = list(iterate_chunks(ifs, n_points, np.random.default_rng(seed), n_walkers=4096))
+    points = np.concatenate(chunks)
+    lo = points.min(axis=0)
+    hi = points.max(axis=0)
+    pad = (hi - lo) * padding + 1e-12
+    lo, hi = lo - pad, hi + pad
+    return (lo[0], hi[0]), (lo[1], hi[1])
+
+
+def _run_stream(args):
+    ifs, n_points, bounds, resolution, seed_seq, n_walkers = args
+    canvas = Canvas(bounds, resolution)
+    for chunk in iterate_chunks(ifs, n_points, np.random.default_rng(seed_seq), n_walkers):
+        canvas.add_points(chunk)
+    return canvas.density
+
+
+def run_chaos_game(ifs, n_points, resolution=1024, bounds=None, n_streams=DEFAULT_STREAMS, n_workers=None, seed=0,
+                   n_walkers=DEFAULT_WALKERS):
+    # Returns (density, bounds); density is a (height, width) grid of hit counts.
+    if bounds is None:
+        bounds = estimate_bounds(ifs, seed=seed)
+    n_workers = (os.cpu_count() or 1) if n_workers is None else n_workers
+    # The split only depends on n_streams and seed, so results are
+    # reproducible regardless of how many processes execute the streams.
+    per_stream = [n_points // n_streams + (1 if i < n_points % n_streams else 0) for i in range(n_streams)]
+    seeds = np.random.SeedSequence(seed).spawn(n_streams)
+    jobs = [(ifs, n, bounds, resolution, s, n_walkers) for n, s in zip(per_stream, seeds) if n > 0]
+
+    canvas = Canvas(bounds, resolution)
+    if n_workers <= 1 or len(jobs) <= 1:
+        for density in map(_run_stream, jobs):
+            canvas.add_density(density)
+    else:
+        with ProcessPoolExecutor(max_workers=min(n_workers, len(jobs))) as executor:
+            for density in executor.map(_run_stream, jobs):
+                canvas.add_density(density)
+    return canvas.density, bounds
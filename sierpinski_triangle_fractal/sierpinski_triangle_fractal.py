@@ -1,5 +1,6 @@
 import numpy as np
-import matplotlib.pyplot as plt
+from fractal_render.raster import Canvas
+from sierpinski_triangle_fractal.chaos_game import run_chaos_game, sierpinski_triangle
 
 # https://en.wikipedia.org/wiki/Sierpi%C5%84ski_triangle
 # The Sierpinski triangle is a fractal that is generated by starting with an
@@ -7,25 +8,24 @@ import matplotlib.pyplot as plt
 # choosing a random vertex and moving halfway towards that vertex.
 # This creates a fractal pattern that is self-similar and has a
 # fractal dimension (Hausdorff dimension) of log(3)/log(2) = 1.585.
+# The chaos game itself runs in sierpinski_triangle_fractal/chaos_game.py,
+# which also handles n-gons, vertex-restriction rules and general affine IFS.
 
 
-# Generate a random starting point inside the triangle using barycentric coordinates
-def random_point_in_triangle(vertices):
-    s, t = sorted(np.random.rand(2))
-    return s * vertices[0] + (t - s) * vertices[1] + (1 - t) * vertices[2]
+def render_sierpinski(path, n_points=10_000_000, resolution=1024, seed=0, n_workers=None):
+    # Vertices of the equilateral triangle
+    ifs = sierpinski_triangle()
+    vertices = ifs.vertices
+    bounds = ((-0.01, 1.01), (-0.01, np.sqrt(3) / 2 + 0.01))
+    density, bounds = run_chaos_game(ifs, n_points, resolution=resolution, bounds=bounds, seed=seed,
+                                     n_workers=n_workers)
 
+    canvas = Canvas(bounds, resolution)
+    canvas.add_density(np.log1p(density))
+    canvas.add_segments(np.stack([vertices, np.roll(vertices, -1, axis=0)], axis=1), weights=canvas.density.max())
+    canvas.save_png(path, tone='linear', color=(220, 0, 0))
+    return canvas
 
-# Vertices of the equilateral triangle
-vertices = np.array([[0, 0], [1, 0], [0.5, np.sqrt(3)/2]])
-point = random_point_in_triangle(vertices)
 
-points = []
-for _ in range(10000):
-    vertex = vertices[np.random.randint(0, 3)]
-    point = (point + vertex) / 2
-    points.append(point)
-
-points = np.array(points)
-plt.plot(*zip(*vertices, vertices[0]), 'k-')
-plt.scatter(points[:, 0], points[:, 1], s=1, color='red')
-plt.show()
+if __name__ == "__main__":
+    render_sierpinski('sierpinski_triangle_fractal/sierpinski_triangle_fractal.png')
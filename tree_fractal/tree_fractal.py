@@ -1,25 +1,98 @@
 import math
+import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
 
+# The tree is generated level by level instead of recursively: all branch tips
+# of one level are advanced with a single NumPy operation and then split into
+# two children each. The result is a flat (n, 5) array of segments
+# [x1, y1, x2, y2, level], which is drawn with one LineCollection or handed to
+# the rasterizer, so depth is bound by memory (2**levels segments), not by
+# Python recursion or the number of matplotlib artists.
 
-def _draw_tree(level, x1, y1, angle, angle_increment):
-    if level == 1:
-        return
-    else:
-        angle_rad = angle * math.pi / 180
-        x2 = x1 + math.sin(angle_rad) * level * 10
-        y2 = y1 + math.cos(angle_rad) * level * 10
+SEGMENT_COLUMNS = ('x1', 'y1', 'x2', 'y2', 'level')
+
+
+def tree_segments(levels=8, angle_increment=30, angle_jitter=0.0, length_jitter=0.0, seed=None):
+    # angle_jitter (degrees) and length_jitter (fraction of the branch length)
+    # randomise each branch independently; both default to the classic tree.
+    rng = np.random.default_rng(seed)
+    x = np.zeros(1)
+    y = np.zeros(1)
+    angle = np.zeros(1)
+    segments = []
+    for level in range(levels, 1, -1):
+        n = len(x)
+        branch_angle = angle + (rng.uniform(-angle_jitter, angle_jitter, n) if angle_jitter else 0.0)
+        length = level * 10 * (1 + (rng.uniform(-length_jitter, length_jitter, n) if length_jitter else 0.0))
+        angle_rad = branch_angle * math.pi / 180
+        x2 = x + np.sin(angle_rad) * length
+        y2 = y + np.cos(angle_rad) * length
+        segments.append(np.column_stack([x, y, x2, y2, np.full(n, level, dtype=np.float64)]))
+
+        # Every tip splits into a +increment and a -increment child
+        x = np.repeat(x2, 2)
+        y = np.repeat(y2, 2)
+        angle = np.repeat(branch_angle, 2) + np.tile([angle_increment, -angle_increment], n)
+    if not segments:
+        return np.empty((0, 5))
+    return np.concatenate(segments)
+
+
+def level_colors(levels):
+    colors = np.asarray(plt.cm.Set1.colors)
+    return colors[np.asarray(levels, dtype=np.int64) % 8]
 
-        colors = plt.cm.Set1.colors
-        plt.plot([x1, x2], [y1, y2], c=colors[level % 8])
 
-        _draw_tree(level - 1, x2, y2, angle + angle_increment, angle_increment)
-        _draw_tree(level - 1, x2, y2, angle - angle_increment, angle_increment)
+def draw_tree(levels=8, angle_increment=30, ax=None, **kwargs):
+    segments = tree_segments(levels, angle_increment, **kwargs)
+    ax = plt.gca() if ax is None else ax
+    lines = LineCollection(segments[:, :4].reshape(-1, 2, 2), colors=level_colors(segments[:, 4]), linewidths=1)
+    ax.add_collection(lines)
+    ax.autoscale_view()
+    ax.set_aspect('equal')
+    return segments
 
 
-def draw_tree(levels=8, angle_increment=30):
-    _draw_tree(levels, 0, 0, 0, angle_increment)
+def render_tree(path, levels=8, angle_increment=30, resolution=1024, tone='coverage', **kwargs):
+    from fractal_render.raster import render_segments
+    segments = tree_segments(levels, angle_increment, **kwargs)
+    return render_segments(segments[:, :4], path, resolution=resolution,
+                           colors=level_colors(segments[:, 4]), tone=tone)
+
+
+def save_segments(path, segments):
+    # .npy keeps the float array as is; anything else is written as CSV
+    if str(path).endswith('.npy'):
+        np.save(path, segments)
+    else:
+        np.savetxt(path, segments, delimiter=',', header=','.join(SEGMENT_COLUMNS), comments='')
+
+
+def save_svg(path, segments, stroke_width=1.0, padding=0.02):
+    if len(segments) == 0:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 1 1"/>\n')
+        return
+    x = segments[:, [0, 2]]
+    y = -segments[:, [1, 3]]
+    x_min, x_max, y_min, y_max = x.min(), x.max(), y.min(), y.max()
+    pad = max(x_max - x_min, y_max - y_min) * padding
+    colors = (level_colors(segments[:, 4]) * 255).round().astype(int)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f'<svg xmlns="http://www.w3.org/2000/svg" '
+                f'viewBox="{x_min - pad:.3f} {y_min - pad:.3f} {x_max - x_min + 2 * pad:.3f} {y_max - y_min + 2 * pad:.3f}" '
+                f'stroke-width="{stroke_width}" stroke-linecap="round">\n')
+        # One path per level keeps the file small for deep trees
+        for level in np.unique(segments[:, 4])[::-1]:
+            mask = segments[:, 4] == level
+            r, g, b = colors[mask][0]
+            d = ''.join(f'M{x1:.3f} {y1:.3f}L{x2:.3f} {y2:.3f}' for x1, y1, x2, y2 in
+                        zip(x[mask, 0], y[mask, 0], x[mask, 1], y[mask, 1]))
+            f.write(f'<path stroke="rgb({r},{g},{b})" fill="none" d="{d}"/>\n')
+        f.write('</svg>\n')
 
 
-draw_tree(levels=12, angle_increment=25)
-plt.show()
+if __name__ == "__main__":
+    draw_tree(levels=12, angle_increment=25)
+    plt.show()